@@ -120,6 +120,34 @@ if not DEBUG:
     }
 
 
+# Caches
+# https://docs.djangoproject.com/en/2.0/topics/cache/
+# The default cache is local to each process and only holds what is keyed by
+# its own version, like rendered snippets. What every web and worker process
+# must agree on, like the public catalog version and rebuild locks, goes to
+# the shared cache: memcached at MEMCACHED_LOCATION (comma separated
+# host:port servers), whose incr and add are atomic. Without it the shared
+# cache is local too, which is only right for a single process.
+
+MEMCACHED_LOCATION = os.getenv('MEMCACHED_LOCATION')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # Two fragments per snippet: room for stories of thousands of
+        # snippets, where LocMemCache would keep only 300 entries.
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': MEMCACHED_LOCATION.split(','),
+    } if MEMCACHED_LOCATION else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
@@ -170,6 +198,24 @@ LOGIN_REDIRECT_URL = 'index'
 
 SITE_DOMAIN = "blackcatstorysharing.herokuapp.com"
 
+SNIPPETS_PER_PAGE = 50
+PUBLIC_STORIES_PER_PAGE = 25
+PUBLIC_STORIES_MAX_PER_PAGE = 100
+PUBLIC_STORIES_CACHE_TIMEOUT = 60
+PUBLIC_STORIES_STALE_TIMEOUT = 60 * 60
+PUBLIC_STORIES_REBUILD_TIMEOUT = 30
+PERSONAL_STORIES_PER_PAGE = 25
+SEARCH_RESULTS_PER_PAGE = 20
+SEARCH_MAX_PAGES = 10
+SEARCH_MAX_CANDIDATES = 5000
+SNIPPET_FRAGMENT_TIMEOUT = 60 * 60 * 24 * 7
+EXPORT_CHUNK_SIZE = 500
+
+# Display pages poll story_sync for changes every STORY_SYNC_POLL_INTERVAL
+# seconds.
+
+STORY_SYNC_POLL_INTERVAL = 15
+
 # Email settings
 
 EMAIL_USE_TLS = True
@@ -184,4 +230,15 @@ else:
     EMAIL_HOST_PASSWORD = os.environ['EMAIL_HOST_PASSWORD']
 EMAIL_PORT = 587
 
+# Outbox delivered by the send_queued_mail management command
+
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60
+EMAIL_MESSAGES_PER_CONNECTION = 100
+
+# Updates for writers who chose digests are merged by send_digests
+
+EMAIL_DIGEST_INTERVAL = 15 * 60
+
 django_heroku.settings(locals())
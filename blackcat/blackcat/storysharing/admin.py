@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Story, Snippet
+from .models import User, Story, Snippet, OutgoingEmail
 
 admin.site.register(User, UserAdmin)
 
 admin.site.register(Story)
 admin.site.register(Snippet)
+admin.site.register(OutgoingEmail)
@@ -0,0 +1,83 @@
+import re
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from .models import Snippet
+
+EXPORT_CONTENT_TYPES = {
+    'html': 'text/html; charset=utf-8',
+    'txt': 'text/plain; charset=utf-8',
+    'md': 'text/markdown; charset=utf-8',
+}
+
+# Output is sent in pieces of about this many characters, rather than one
+# write per snippet.
+EXPORT_BUFFER_SIZE = 8192
+
+MARKDOWN_INLINE = re.compile(r'([\\`*_\[\]<>])')
+MARKDOWN_LINE_START = re.compile(r'^(\s*)([#>+-]|\d+\.)', re.MULTILINE)
+
+
+def iter_snippet_texts(story):
+    """
+    Yield the text of every snippet of story in order, fetched in chunks of
+    EXPORT_CHUNK_SIZE rows (from a server-side cursor on PostgreSQL), so
+    memory use doesn't grow with the story.
+    """
+    return Snippet.objects.filter(story=story).order_by('pk').values_list(
+        'text', flat=True
+    ).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def escape_markdown(text):
+    text = MARKDOWN_INLINE.sub(r'\\\1', text)
+    return MARKDOWN_LINE_START.sub(r'\1\\\2', text)
+
+
+def export_html(story):
+    # The head goes out on its own so the browser can start right away.
+    yield render_to_string(
+        'storysharing/printable_export_head.html', {'story': story}
+    )
+    yield from buffered(
+        '        <p class="links">{}</p>\n'.format(escape(text))
+        for text in iter_snippet_texts(story)
+    )
+    yield "    </div>\n</div>\n"
+
+
+def export_txt(story):
+    yield "{}\n\n".format(story.title.title())
+    yield from buffered(
+        "{}\n\n".format(text) for text in iter_snippet_texts(story)
+    )
+
+
+def export_md(story):
+    yield "# {}\n\n".format(escape_markdown(story.title.title()))
+    yield from buffered(
+        "{}\n\n".format(escape_markdown(text))
+        for text in iter_snippet_texts(story)
+    )
+
+
+EXPORTERS = {
+    'html': export_html,
+    'txt': export_txt,
+    'md': export_md,
+}
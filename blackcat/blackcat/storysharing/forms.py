@@ -1,5 +1,8 @@
 from django.contrib.admin.widgets import FilteredSelectMultiple
-from django.forms import ModelForm, HiddenInput, CheckboxInput
+from django.forms import (
+    Form, ModelForm, HiddenInput, CheckboxInput, MultipleHiddenInput,
+    ModelMultipleChoiceField
+)
 from .models import Story, StoryWriter, Snippet
 
 
@@ -37,6 +40,19 @@ class StoryWriterActiveForm(ModelForm):
         }
 
 
+class StoryWriterBulkActiveForm(Form):
+    """
+    The stories listed on a page of personal stories, and those of them the
+    writer wants to be active in.
+    """
+    story = ModelMultipleChoiceField(
+        queryset=Story.objects.only('pk'), widget=MultipleHiddenInput
+    )
+    active = ModelMultipleChoiceField(
+        queryset=Story.objects.only('pk'), required=False
+    )
+
+
 class CreateSnippetForm(ModelForm):
 
     class Meta:
@@ -0,0 +1,115 @@
+import gzip
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from .models import Snippet, PrintableSnapshot
+
+FRAGMENT_TEMPLATES = {
+    'display': 'storysharing/snippet_text.html',
+    'printable': 'storysharing/printable_snippet.html',
+}
+
+# The snippet columns each kind of fragment, and its cache key, reads.
+FRAGMENT_FIELDS = {
+    'display': ('version', 'text', 'edited'),
+    'printable': ('version', 'text'),
+}
+
+
+def render_snippet_fragments(snippets, kind):
+    """
+    Set snippet.fragment to the rendered html of every snippet.
+
+    Fragments are cached by snippet id and version (see Snippet.save), so a
+    page of snippets costs one cache round trip and only snippets that are
+    new or were edited since the last render go through the template.
+    """
+    snippets_by_key = {
+        snippet.get_fragment_cache_key(kind): snippet for snippet in snippets
+    }
+    fragments = cache.get_many(list(snippets_by_key))
+    missing = {}
+    for key, snippet in snippets_by_key.items():
+        if key not in fragments:
+            fragments[key] = missing[key] = render_to_string(
+                FRAGMENT_TEMPLATES[kind], {'snippet': snippet}
+            )
+        snippet.fragment = mark_safe(fragments[key])
+
+    if missing:
+        cache.set_many(missing, settings.SNIPPET_FRAGMENT_TIMEOUT)
+    return snippets
+
+
+def get_printable_snapshot(story):
+    """
+    Return the PrintableSnapshot of story at its current version, building
+    it when the story changed after the stored one was made.
+    """
+    snapshot = PrintableSnapshot.objects.filter(
+        story=story, version=story.version
+    ).first()
+    if snapshot is not None:
+        return snapshot
+
+    snippets = render_snippet_fragments(
+        Snippet.objects.filter(story=story).only(
+            *FRAGMENT_FIELDS['printable']
+        ).order_by('pk'),
+        'printable'
+    )
+    body = render_to_string('storysharing/printable_story_body.html', {
+        'story': story, 'snippets': snippets
+    })
+    page = render_to_string('storysharing/printable_story.html', {
+        'story': story,
+        'object': story,
+        'story_body': mark_safe(body),
+        'user': AnonymousUser(),
+        'is_writer': False
+    })
+    snapshot, _ = PrintableSnapshot.objects.update_or_create(
+        story=story, defaults={
+            'version': story.version,
+            'body': body,
+            'page_gzip': gzip.compress(page.encode())
+        }
+    )
+    return snapshot
+
+
+def get_versioned_fragment(key, version, render, timeout, stale_timeout,
+                           rebuild_timeout):
+    """
+    Return the html cached under key if it was rendered at version less
+    than timeout seconds ago, otherwise the html of render().
+
+    Outdated html is kept for stale_timeout seconds. While one request
+    renders a new copy, holding a lock for up to rebuild_timeout seconds,
+    the others keep getting the outdated one instead of all rendering it
+    at once. Both the html and the lock are kept in the shared cache, so
+    processes take turns too.
+    """
+    shared_cache = caches['shared']
+    entry = shared_cache.get(key)
+    lock_key = key + ':rebuild'
+    locked = False
+    if entry is not None:
+        entry_version, fresh_until, html = entry
+        if entry_version == version and time.time() < fresh_until:
+            return mark_safe(html)
+        locked = shared_cache.add(lock_key, True, rebuild_timeout)
+        if not locked:
+            return mark_safe(html)
+
+    html = render()
+    shared_cache.set(
+        key, (version, time.time() + timeout, html), stale_timeout
+    )
+    if locked:
+        shared_cache.delete(lock_key)
+    return mark_safe(html)
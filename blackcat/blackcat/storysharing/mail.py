@@ -0,0 +1,153 @@
+import datetime
+import itertools
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from .models import OutgoingEmail, StoryUpdate
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    """
+    Store one outgoing email per recipient in the outbox.
+
+    Takes the same arguments as django's send_mail, but only writes to the
+    database (a single INSERT for all the recipients), so it joins the
+    caller's transaction and never talks to SMTP. The send_queued_mail
+    command delivers the queued emails.
+    """
+    OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(
+            subject=subject,
+            body=message,
+            from_email=from_email,
+            to_email=recipient
+        ) for recipient in recipient_list
+    ])
+
+
+def defer_email(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.send_after = now + datetime.timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1)
+    )
+    email.save()
+
+
+def send_queued_mail(batch_size=None):
+    """
+    Deliver a batch of due emails from the outbox.
+
+    The batch is locked while it is being sent so that several workers can
+    drain the outbox at the same time. Emails share one SMTP connection,
+    which is reopened every EMAIL_MESSAGES_PER_CONNECTION messages.
+    Failed emails are retried later with an exponential backoff, up to
+    EMAIL_OUTBOX_MAX_ATTEMPTS times.
+    Returns a (sent, failed) tuple with the number of emails in each state.
+    """
+    if batch_size is None:
+        batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    sent = failed = 0
+
+    with transaction.atomic():
+        batch = list(OutgoingEmail.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            sent__isnull=True,
+            send_after__lte=now,
+            attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        ).order_by('send_after', 'pk')[:batch_size])
+
+        if not batch:
+            return sent, failed
+
+        per_connection = settings.EMAIL_MESSAGES_PER_CONNECTION
+        for start in range(0, len(batch), per_connection):
+            chunk = batch[start:start + per_connection]
+            connection = get_connection()
+            try:
+                connection.open()
+            except Exception as error:
+                for email in chunk:
+                    defer_email(email, error, now)
+                failed += len(chunk)
+                continue
+
+            for email in chunk:
+                try:
+                    EmailMessage(
+                        email.subject,
+                        email.body,
+                        email.from_email,
+                        [email.to_email],
+                        connection=connection
+                    ).send()
+                except Exception as error:
+                    defer_email(email, error, now)
+                    failed += 1
+                else:
+                    email.attempts += 1
+                    email.sent = timezone.now()
+                    email.save()
+                    sent += 1
+
+            connection.close()
+
+    return sent, failed
+
+
+def get_digest_body(updates):
+    body = "We've got some updates regarding your stories:\n\n"
+    for story, story_updates in itertools.groupby(
+            updates, key=lambda update: update.story):
+        body += "\"{}\":\n".format(story.title.title())
+        for update in story_updates:
+            body += "- {}\n".format(update.text)
+        body += "You can visit your story here: {}\n\n".format(
+            settings.SITE_DOMAIN + reverse(
+                'display_story', kwargs={'id': story.id}
+            )
+        )
+    return body + "If you want to receive every update as it {}".format(
+        "happens, unset the digest option in your profile here: {}\n".format(
+            settings.SITE_DOMAIN + reverse('profile')
+        )
+    ) + "Kindly, the {} team.".format(settings.SITE_DOMAIN)
+
+
+def queue_digests():
+    """
+    Merge the buffered story updates into a single email per writer.
+
+    Writers with digest_updates set don't get one email per update; their
+    updates are stored as StoryUpdate rows until the send_digests command
+    turns them into a digest in the outbox.
+    Returns the number of digests queued.
+    """
+    with transaction.atomic():
+        # Only the StoryUpdate rows are locked: locking the joined story
+        # rows too would hold up snippets being added to those stories.
+        updates = list(StoryUpdate.objects.select_for_update(
+            skip_locked=True, of=('self',)
+        ).select_related('writer', 'story').order_by('writer', 'story', 'pk'))
+
+        digests = 0
+        for writer, writer_updates in itertools.groupby(
+                updates, key=lambda update: update.writer):
+            queue_mail(
+                "Black Cat Story Sharing - Updates",
+                get_digest_body(list(writer_updates)),
+                settings.EMAIL_HOST_USER,
+                [writer.email]
+            )
+            digests += 1
+
+        StoryUpdate.objects.filter(
+            pk__in=[update.pk for update in updates]
+        ).delete()
+
+    return digests
@@ -0,0 +1,154 @@
+import socketserver
+import threading
+import time
+
+from django.core.mail import send_mail
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from blackcat.storysharing.mail import queue_mail, send_queued_mail
+from blackcat.storysharing.models import OutgoingEmail
+
+SUBJECT = "Black Cat Story Sharing - Update"
+BODY = "We've got an update regarding your story."
+FROM_EMAIL = "blackcat@localhost"
+
+
+class Rollback(Exception):
+    pass
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP to accept and discard every message."""
+
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        time.sleep(self.server.connect_delay)
+        self.reply("220 localhost sink ready")
+        for line in self.rfile:
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command == "DATA":
+                self.reply("354 end data with <CR><LF>.<CR><LF>")
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                break
+            else:
+                self.reply("250 OK")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay):
+        self.connect_delay = connect_delay
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-story notification time against a local SMTP sink: one "
+        "connection per message, against the outbox drained by "
+        "send_queued_mail. Queued emails are rolled back after each run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', type=int, nargs='+', default=[2, 10, 50],
+            help="Number of writers (recipients) per story notification."
+        )
+        parser.add_argument(
+            '--connect-delay', type=float, default=0.05,
+            help="Seconds the sink waits before greeting a new connection, "
+                 "standing in for the TCP and TLS handshake with EMAIL_HOST."
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help="Runs per measurement; the best one is reported."
+        )
+
+    def get_recipients(self, writers):
+        return [
+            "writer{}@localhost".format(number) for number in range(writers)
+        ]
+
+    def one_connection_per_message(self, writers):
+        for recipient in self.get_recipients(writers):
+            send_mail(SUBJECT, BODY, FROM_EMAIL, [recipient])
+
+    def reused_connection(self, writers):
+        queue_mail(SUBJECT, BODY, FROM_EMAIL, self.get_recipients(writers))
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued_mail()
+            total_sent += sent
+            total_failed += failed
+            if not (sent or failed):
+                break
+        if total_sent != writers or total_failed:
+            raise CommandError(
+                "send_queued_mail sent {} and failed {} of {} emails.".format(
+                    total_sent, total_failed, writers
+                )
+            )
+
+    def measure(self, function, writers, repeat):
+        timings = []
+        for _ in range(repeat):
+            try:
+                with transaction.atomic():
+                    start = time.perf_counter()
+                    function(writers)
+                    timings.append(time.perf_counter() - start)
+                    raise Rollback
+            except Rollback:
+                pass
+        return min(timings)
+
+    def handle(self, *args, **options):
+        if OutgoingEmail.objects.filter(
+            sent__isnull=True, send_after__lte=timezone.now()
+        ).exists():
+            raise CommandError(
+                "The outbox has emails waiting; run send_queued_mail first."
+            )
+
+        sink = SMTPSink(options['connect_delay'])
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        sink_settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=sink.server_address[1],
+            EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False, EMAIL_USE_SSL=False
+        )
+
+        self.stdout.write("{:>8} {:>18} {:>18} {:>8}".format(
+            "writers", "per message (s)", "outbox (s)", "speedup"
+        ))
+        try:
+            with sink_settings:
+                for writers in options['writers']:
+                    before = self.measure(
+                        self.one_connection_per_message,
+                        writers, options['repeat']
+                    )
+                    after = self.measure(
+                        self.reused_connection, writers, options['repeat']
+                    )
+                    self.stdout.write(
+                        "{:>8} {:>18.4f} {:>18.4f} {:>7.1f}x".format(
+                            writers, before, after, before / after
+                        )
+                    )
+        finally:
+            sink.shutdown()
+            sink.server_close()
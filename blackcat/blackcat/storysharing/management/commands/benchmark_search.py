@@ -0,0 +1,147 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from blackcat.storysharing.models import Story, Snippet, SearchDocument
+from blackcat.storysharing.search import search_stories
+
+TITLE_PREFIX = "Search benchmark story"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time story searches over a synthetic corpus. The corpus is written "
+        "inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snippets', type=int, default=1000000)
+        parser.add_argument('--stories', type=int, default=10000)
+        parser.add_argument(
+            '--words', type=int, default=30,
+            help="Words per snippet."
+        )
+        parser.add_argument(
+            '--vocabulary', type=int, default=20000,
+            help="Distinct words, used with a Zipf-like frequency."
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help="Runs per measurement; the best one is reported."
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def build_corpus(self, options):
+        generator = random.Random(options['seed'])
+        vocabulary = [
+            "word{}".format(number) for number in range(options['vocabulary'])
+        ]
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        batch_size = options['batch_size']
+
+        Story.objects.bulk_create([
+            Story(
+                title="{} {}".format(TITLE_PREFIX, number),
+                slug="search-benchmark-story-{}".format(number),
+                public=True
+            )
+            for number in range(options['stories'])
+        ])
+        story_ids = list(Story.objects.filter(
+            title__startswith=TITLE_PREFIX
+        ).values_list('pk', flat=True))
+        SearchDocument.objects.bulk_create([
+            SearchDocument(story_id=story_id, text=title)
+            for story_id, title in Story.objects.filter(
+                pk__in=story_ids
+            ).values_list('pk', 'title')
+        ])
+
+        for start in range(0, options['snippets'], batch_size):
+            count = min(batch_size, options['snippets'] - start)
+            Snippet.objects.bulk_create([
+                Snippet(
+                    story_id=generator.choice(story_ids),
+                    text=" ".join(generator.choices(
+                        vocabulary, weights, k=options['words']
+                    ))
+                )
+                for _ in range(count)
+            ])
+            self.stdout.write("Written {} snippets".format(start + count))
+
+        # In the order Snippet.save writes them, so the newest documents
+        # come from many stories.
+        documents = []
+        for snippet_id, story_id, text in Snippet.objects.filter(
+            story_id__in=story_ids
+        ).order_by('pk').values_list('pk', 'story_id', 'text').iterator(
+            chunk_size=batch_size
+        ):
+            documents.append(SearchDocument(
+                story_id=story_id, snippet_id=snippet_id, text=text
+            ))
+            if len(documents) >= batch_size:
+                SearchDocument.objects.bulk_create(documents)
+                documents = []
+        SearchDocument.objects.bulk_create(documents)
+        return vocabulary
+
+    def measure(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        self.stdout.write("Database: {}".format(connection.vendor))
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                vocabulary = self.build_corpus(options)
+                self.stdout.write("Corpus built in {:.1f}s".format(
+                    time.perf_counter() - start
+                ))
+
+                searches = [
+                    ("common word", vocabulary[0]),
+                    ("mid word", vocabulary[len(vocabulary) // 10]),
+                    ("rare word", vocabulary[-1]),
+                    ("two words", "{} {}".format(
+                        vocabulary[1], vocabulary[len(vocabulary) // 2]
+                    )),
+                    ("no match", "nosuchword"),
+                    ("title", "benchmark"),
+                ]
+                self.stdout.write("{:>12} {:>14} {:>14} {:>14}".format(
+                    "search", "page 1 (ms)", "page 5 (ms)", "LIKE scan (ms)"
+                ))
+                for name, terms in searches:
+                    first = self.measure(
+                        lambda: search_stories(terms, 1, 20),
+                        options['repeat']
+                    )
+                    fifth = self.measure(
+                        lambda: search_stories(terms, 5, 20),
+                        options['repeat']
+                    )
+                    # What a search without the index would cost.
+                    like = self.measure(lambda: list(Snippet.objects.filter(
+                        text__icontains=terms.split()[0], story__public=True
+                    ).values_list('story_id', flat=True).distinct()[:21]), 1)
+                    self.stdout.write(
+                        "{:>12} {:>14.1f} {:>14.1f} {:>14.1f}".format(
+                            name, first * 1000, fifth * 1000, like * 1000
+                        )
+                    )
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Corpus rolled back.")
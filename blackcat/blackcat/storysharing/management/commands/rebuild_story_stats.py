@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import (
+    Count, F, IntegerField, OuterRef, Subquery, Value
+)
+from django.db.models.functions import Coalesce
+from blackcat.storysharing.models import Story, Snippet
+
+# Keeps pk__in lists under the query parameter limit of SQLite.
+BATCH_SIZE = 500
+
+
+def in_batches(pks):
+    for start in range(0, len(pks), BATCH_SIZE):
+        yield pks[start:start + BATCH_SIZE]
+
+
+class Command(BaseCommand):
+    help = "Recompute snippet count and last snippet of every story."
+
+    def handle(self, *args, **options):
+        snippet_counts = Coalesce(
+            Subquery(
+                Snippet.objects.filter(
+                    story=OuterRef('pk')
+                ).order_by().values('story').annotate(
+                    count=Count('pk')
+                ).values('count'),
+                output_field=IntegerField()
+            ),
+            Value(0)
+        )
+        last_snippets = Snippet.objects.filter(
+            story=OuterRef('pk')
+        ).order_by('-pk')
+
+        with transaction.atomic():
+            stories = Story.objects.annotate(
+                new_count=snippet_counts,
+                new_last_snippet=Subquery(last_snippets.values('pk')[:1]),
+                new_last_author=Subquery(last_snippets.values('author')[:1])
+            ).values_list(
+                'pk', 'snippet_count', 'last_snippet', 'last_author',
+                'new_count', 'new_last_snippet', 'new_last_author'
+            )
+            changed, moved = [], []
+            for pk, *stats, count, last_snippet, last_author in (
+                stories.iterator()
+            ):
+                if stats != [count, last_snippet, last_author]:
+                    changed.append(pk)
+                if stats[1] != last_snippet:
+                    moved.append(pk)
+
+            for pks in in_batches(changed):
+                Story.objects.filter(pk__in=pks).update(
+                    snippet_count=snippet_counts,
+                    last_snippet=Subquery(last_snippets.values('pk')[:1]),
+                    last_author=Subquery(last_snippets.values('author')[:1])
+                )
+            for pks in in_batches(moved):
+                # Snippets don't record when they were written; the last
+                # change to the story is the closest known activity.
+                Story.objects.filter(
+                    pk__in=pks, last_snippet__isnull=False
+                ).update(last_activity=F('last_modified'))
+                Story.objects.filter(
+                    pk__in=pks, last_snippet__isnull=True
+                ).update(last_activity=None)
+            # The stories' pages changed: move them to a new version so
+            # conditional GETs and printable snapshots don't serve the
+            # old stats.
+            for pks in in_batches(changed):
+                Story.touch(*pks)
+
+        self.stdout.write("Rebuilt the stats of {} stories.".format(
+            len(changed)
+        ))
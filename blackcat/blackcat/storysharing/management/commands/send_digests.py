@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blackcat.storysharing.mail import queue_digests
+
+
+class Command(BaseCommand):
+    help = "Queue one digest email per writer with buffered story updates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep queueing digests every EMAIL_DIGEST_INTERVAL seconds."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            digests = queue_digests()
+            self.stdout.write("Queued {} digests.".format(digests))
+            if not options['loop']:
+                break
+            time.sleep(settings.EMAIL_DIGEST_INTERVAL)
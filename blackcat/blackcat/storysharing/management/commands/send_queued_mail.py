@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from blackcat.storysharing.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = "Deliver the emails waiting in the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help="Number of emails to send per batch."
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep polling the outbox instead of exiting when empty."
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=5,
+            help="Seconds to wait between polls when the outbox is empty."
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued_mail(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write("Sent {} emails, {} failed.".format(
+            total_sent, total_failed
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 2.0.3 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storysharing', '0013_storyupdate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='snippet',
+            index=models.Index(fields=['story', 'id'], name='storysharin_story_i_de282f_idx'),
+        ),
+    ]
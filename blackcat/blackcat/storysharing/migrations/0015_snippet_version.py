@@ -0,0 +1,18 @@
+# Generated by Django 2.0.3 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storysharing', '0014_snippet_story_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='snippet',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    def remove_duplicate_storywriters(apps, schema_editor):
+        StoryWriter = apps.get_model('storysharing', 'StoryWriter')
+
+        kept = {}
+        for storywriter in StoryWriter.objects.order_by('pk'):
+            key = (storywriter.story_id, storywriter.writer_id)
+            if key not in kept:
+                kept[key] = storywriter
+                continue
+            if storywriter.active and not kept[key].active:
+                kept[key].active = True
+                kept[key].save()
+            storywriter.delete()
+
+    dependencies = [
+        ('storysharing', '0015_snippet_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_storywriters, migrations.RunPython.noop
+        ),
+        migrations.AlterUniqueTogether(
+            name='storywriter',
+            unique_together={('story', 'writer')},
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storysharing', '0016_storywriter_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='last_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
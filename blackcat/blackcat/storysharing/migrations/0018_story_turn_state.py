@@ -0,0 +1,52 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    def fill_turn_state(apps, schema_editor):
+        Story = apps.get_model('storysharing', 'Story')
+        Snippet = apps.get_model('storysharing', 'Snippet')
+
+        for story in Story.objects.all():
+            snippets = Snippet.objects.filter(story=story).order_by('-pk')
+            last_snippet = snippets.first()
+            if last_snippet is None:
+                continue
+            Story.objects.filter(pk=story.pk).update(
+                snippet_count=snippets.count(),
+                last_snippet=last_snippet,
+                last_author_id=last_snippet.author_id,
+                last_activity=story.last_modified
+            )
+
+    dependencies = [
+        ('storysharing', '0017_story_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='last_activity',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='last_author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='last_snippet',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='storysharing.Snippet'),
+        ),
+        migrations.AddField(
+            model_name='story',
+            name='snippet_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_turn_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storysharing', '0018_story_turn_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoryEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('snippet_added', 'New snippet'), ('snippet_edited', 'Snippet edited'), ('settings_changed', 'Settings changed')], max_length=20)),
+                ('snippet_id', models.PositiveIntegerField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('story', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storysharing.Story')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='storyevent',
+            index=models.Index(fields=['story', 'id'], name='storysharin_story_i_9a752d_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    def fill_story_version(apps, schema_editor):
+        Story = apps.get_model('storysharing', 'Story')
+        Snippet = apps.get_model('storysharing', 'Snippet')
+
+        # Give every existing snippet a version of its own, after the
+        # story's current one, so sync cursors never tie.
+        for story in Story.objects.all():
+            version = story.version
+            for snippet_id in Snippet.objects.filter(
+                story=story
+            ).order_by('pk').values_list('pk', flat=True):
+                version += 1
+                Snippet.objects.filter(pk=snippet_id).update(
+                    story_version=version
+                )
+            Story.objects.filter(pk=story.pk).update(version=version)
+
+    dependencies = [
+        ('storysharing', '0019_storyevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='snippet',
+            name='story_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_story_version, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='snippet',
+            index=models.Index(fields=['story', 'story_version'], name='storysharin_story_i_050c7f_idx'),
+        ),
+    ]
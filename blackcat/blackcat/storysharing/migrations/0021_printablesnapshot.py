@@ -0,0 +1,24 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storysharing', '0020_snippet_story_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrintableSnapshot',
+            fields=[
+                ('story', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='storysharing.Story')),
+                ('version', models.PositiveIntegerField()),
+                ('body', models.TextField()),
+                ('page_gzip', models.BinaryField()),
+                ('rendered', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
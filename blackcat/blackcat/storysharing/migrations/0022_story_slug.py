@@ -0,0 +1,29 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:20
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+class Migration(migrations.Migration):
+
+    def fill_slug(apps, schema_editor):
+        Story = apps.get_model('storysharing', 'Story')
+
+        for story in Story.objects.all():
+            Story.objects.filter(pk=story.pk).update(
+                slug=slugify(story.title)
+            )
+
+    dependencies = [
+        ('storysharing', '0021_printablesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='slug',
+            field=models.SlugField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_slug, migrations.RunPython.noop),
+    ]
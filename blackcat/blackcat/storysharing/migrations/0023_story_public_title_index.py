@@ -0,0 +1,17 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storysharing', '0022_story_slug'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['public', 'title', 'id'], name='storysharin_public_2d3ab8_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE storysharing_searchdocument_fts USING fts5("
+    "text, content='storysharing_searchdocument', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    "CREATE TRIGGER storysharing_searchdocument_ai "
+    "AFTER INSERT ON storysharing_searchdocument BEGIN "
+    "INSERT INTO storysharing_searchdocument_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER storysharing_searchdocument_ad "
+    "AFTER DELETE ON storysharing_searchdocument BEGIN "
+    "INSERT INTO storysharing_searchdocument_fts("
+    "storysharing_searchdocument_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER storysharing_searchdocument_au "
+    "AFTER UPDATE ON storysharing_searchdocument BEGIN "
+    "INSERT INTO storysharing_searchdocument_fts("
+    "storysharing_searchdocument_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO storysharing_searchdocument_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+]
+
+SQLITE_DROP_INDEX = [
+    "DROP TRIGGER storysharing_searchdocument_au",
+    "DROP TRIGGER storysharing_searchdocument_ad",
+    "DROP TRIGGER storysharing_searchdocument_ai",
+    "DROP TABLE storysharing_searchdocument_fts",
+]
+
+POSTGRESQL_INDEX = [
+    "CREATE INDEX storysharing_searchdocument_text_fts "
+    "ON storysharing_searchdocument "
+    "USING GIN (to_tsvector('english', text))",
+]
+
+POSTGRESQL_DROP_INDEX = [
+    "DROP INDEX storysharing_searchdocument_text_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    def create_fulltext_index(apps, schema_editor):
+        statements = {
+            'sqlite': SQLITE_INDEX,
+            'postgresql': POSTGRESQL_INDEX,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    def drop_fulltext_index(apps, schema_editor):
+        statements = {
+            'sqlite': SQLITE_DROP_INDEX,
+            'postgresql': POSTGRESQL_DROP_INDEX,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    def fill_search_documents(apps, schema_editor):
+        Story = apps.get_model('storysharing', 'Story')
+        Snippet = apps.get_model('storysharing', 'Snippet')
+        SearchDocument = apps.get_model('storysharing', 'SearchDocument')
+
+        for story in Story.objects.filter(public=True):
+            SearchDocument.objects.create(story=story, text=story.title)
+            SearchDocument.objects.bulk_create([
+                SearchDocument(story=story, snippet=snippet, text=snippet.text)
+                for snippet in Snippet.objects.filter(story=story)
+            ], batch_size=500)
+
+    dependencies = [
+        ('storysharing', '0023_story_public_title_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField()),
+                ('snippet', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='storysharing.Snippet')),
+                ('story', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='storysharing.Story')),
+            ],
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(
+            fill_search_documents, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    def fill_active_writer_count(apps, schema_editor):
+        Story = apps.get_model('storysharing', 'Story')
+        StoryWriter = apps.get_model('storysharing', 'StoryWriter')
+
+        counts = StoryWriter.objects.filter(active=True).values(
+            'story_id'
+        ).annotate(count=models.Count('pk')).values_list(
+            'story_id', 'count'
+        )
+        for story_id, count in counts:
+            Story.objects.filter(pk=story_id).update(
+                active_writer_count=count
+            )
+        # From now on stories are available exactly while two or more of
+        # their writers are active.
+        Story.objects.filter(active_writer_count__gte=2).update(
+            available=True
+        )
+        Story.objects.filter(active_writer_count__lt=2).update(
+            available=False
+        )
+
+    dependencies = [
+        ('storysharing', '0024_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='story',
+            name='active_writer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(
+            fill_active_writer_count, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 2.0.3 on 2026-10-18 16:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storysharing', '0025_story_active_writer_count'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='StoryEvent',
+        ),
+    ]
@@ -1,17 +1,216 @@
+import time
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.cache import cache, caches
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.text import slugify
 
 
 class User(AbstractUser):
-    pass
+    digest_updates = models.BooleanField(default=False)
 
 
 class Story(models.Model):
     title = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100)
     public = models.BooleanField(default=False)
     available = models.BooleanField(default=False)
+    active_writer_count = models.PositiveIntegerField(default=0)
     writers = models.ManyToManyField(User, through='StoryWriter')
     shareable = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=1)
+    last_modified = models.DateTimeField(default=timezone.now)
+    snippet_count = models.PositiveIntegerField(default=0)
+    last_snippet = models.ForeignKey(
+        'Snippet', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+'
+    )
+    last_author = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+'
+    )
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    # Only ever changed by atomic UPDATEs, never written back by save().
+    maintained_fields = (
+        'version', 'last_modified', 'snippet_count', 'last_snippet',
+        'last_author', 'last_activity', 'available', 'active_writer_count'
+    )
+
+    # A story can be played once this many of its writers are active.
+    min_active_writers = 2
+
+    catalog_version_key = 'public_catalog:version'
+
+    class Meta:
+        # The public stories pages range over public stories by (title, id).
+        indexes = [models.Index(fields=['public', 'title', 'id'])]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @classmethod
+    def get_catalog_version(cls):
+        """
+        Return the version of everything the public stories listing shows,
+        which its cached pages are checked against. It is kept in the shared
+        cache, so a change bumps it for every process.
+        """
+        shared_cache = caches['shared']
+        version = shared_cache.get(cls.catalog_version_key)
+        if version is None:
+            # Starting from the clock keeps a lost version from coming back
+            # to one that older cached pages were built under.
+            shared_cache.add(
+                cls.catalog_version_key, int(time.time() * 1000), None
+            )
+            version = shared_cache.get(cls.catalog_version_key)
+        return version
+
+    @classmethod
+    def bump_catalog_version(cls):
+        """
+        Move the public catalog to a new version once the change is
+        committed (right away outside a transaction): pages rebuilt before
+        that wouldn't see it.
+        """
+        transaction.on_commit(cls.incr_catalog_version)
+
+    @classmethod
+    def incr_catalog_version(cls):
+        shared_cache = caches['shared']
+        try:
+            shared_cache.incr(cls.catalog_version_key)
+        except ValueError:
+            shared_cache.set(
+                cls.catalog_version_key, int(time.time() * 1000), None
+            )
+
+    @classmethod
+    def touch(cls, *pks, **changes):
+        """
+        Move the stories to a new version after anything shown on their
+        pages changed; the version and last_modified drive their conditional
+        GETs. Other maintained fields can be updated in the same statement.
+        """
+        cls.objects.filter(pk__in=pks).update(
+            version=models.F('version') + 1,
+            last_modified=timezone.now(),
+            **changes
+        )
+
+    @classmethod
+    def add_snippet(cls, snippet):
+        cls.touch(
+            snippet.story_id,
+            snippet_count=models.F('snippet_count') + 1,
+            last_snippet=snippet,
+            last_author_id=snippet.author_id,
+            last_activity=timezone.now()
+        )
+
+    @classmethod
+    def add_active_writers(cls, pks, delta):
+        """
+        Change the active writer count of the stories by delta. Run it in
+        the transaction that changes the StoryWriter rows: the UPDATE locks
+        the story rows until that transaction ends, so concurrent changes
+        are counted one after the other.
+        """
+        cls.touch(
+            *pks, active_writer_count=models.F('active_writer_count') + delta
+        )
+
+    @classmethod
+    def update_availability(cls, pks):
+        """
+        Make the stories available exactly while they have
+        min_active_writers active writers, and return the pks of those that
+        became available and of those that stopped being available.
+        """
+        flips = []
+        for available, condition in (
+            (True, models.Q(active_writer_count__gte=cls.min_active_writers)),
+            (False, models.Q(active_writer_count__lt=cls.min_active_writers))
+        ):
+            stories = cls.objects.filter(
+                condition, pk__in=pks, available=not available
+            )
+            flipped = set(stories.values_list('pk', flat=True))
+            if flipped:
+                stories.filter(pk__in=flipped).update(available=available)
+            flips.append(flipped)
+        return flips
+
+    def save(self, *args, **kwargs):
+        self.slug = slugify(self.title)
+        adding = self._state.adding
+        if adding or kwargs.get('update_fields') is not None:
+            super().save(*args, **kwargs)
+        else:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.maintained_fields
+            ]
+            super().save(*args, **kwargs)
+            Story.touch(self.pk)
+        if self.public or (
+            not adding
+            and getattr(self, '_loaded_values', {}).get('public', True)
+        ):
+            Story.bump_catalog_version()
+        self._loaded_values = {'public': self.public}
+        SearchDocument.sync_story(self, created=adding)
+
+    def get_active_writers(self):
+        """
+        Return (writer id, email, digest_updates) for every active writer.
+
+        Fetched with a single query and kept on the instance for the rest of
+        the request; call clear_active_writers after changing StoryWriter
+        active flags.
+        """
+        if not hasattr(self, '_active_writers'):
+            self._active_writers = list(self.storywriter_set.filter(
+                active=True
+            ).values_list(
+                'writer_id', 'writer__email', 'writer__digest_updates'
+            ))
+        return self._active_writers
+
+    def get_active_writer_emails(self):
+        return [email for _, email, _ in self.get_active_writers()]
+
+    def clear_active_writers(self):
+        self.__dict__.pop('_active_writers', None)
+
+    def get_storywriter(self, user):
+        """
+        Return the StoryWriter row of user in this story, or None if they are
+        not one of its writers.
+
+        Answered by a single lookup on the unique (story, writer) index and
+        kept on the instance for the rest of the request.
+        """
+        if not user.is_authenticated:
+            return None
+        if not hasattr(self, '_storywriters'):
+            self._storywriters = {}
+        if user.pk not in self._storywriters:
+            self._storywriters[user.pk] = self.storywriter_set.filter(
+                writer=user
+            ).first()
+        return self._storywriters[user.pk]
+
+    def has_writer(self, user):
+        return self.get_storywriter(user) is not None
 
 
 class Snippet(models.Model):
@@ -20,9 +219,280 @@ class Snippet(models.Model):
         User, on_delete=models.SET_NULL, null=True, blank=False)
     text = models.TextField(max_length=1000)
     edited = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=1)
+    # The story version this snippet was last added or edited in.
+    story_version = models.PositiveIntegerField(default=0)
+
+    fragment_kinds = ('display', 'printable')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['story', 'id']),
+            models.Index(fields=['story', 'story_version']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def get_fragment_cache_key(self, kind, version=None):
+        return 'snippet:{}:{}:{}'.format(
+            kind, self.pk, self.version if version is None else version
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Bump the version when the rendered content changes, so cached
+        fragments of the old version stop being used.
+
+        Added or changed snippets also record the story version they move
+        the story to, with the story row locked so no other change can take
+        the same version; story syncs look them up by it.
+        """
+        loaded = getattr(self, '_loaded_values', {})
+        adding = self._state.adding
+        old_version = self.version
+        if any(
+            field in loaded and loaded[field] != getattr(self, field)
+            for field in ('text', 'edited')
+        ):
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {
+                    'version', 'story_version'
+                }
+
+        with transaction.atomic():
+            if adding or self.version != old_version:
+                story_version, public = Story.objects.select_for_update(
+                ).filter(pk=self.story_id).values_list(
+                    'version', 'public'
+                ).get()
+                self.story_version = story_version + 1
+            super().save(*args, **kwargs)
+            if adding:
+                Story.add_snippet(self)
+                if public:
+                    Story.bump_catalog_version()
+                    SearchDocument.objects.create(
+                        story_id=self.story_id, snippet=self, text=self.text
+                    )
+            elif self.version != old_version:
+                Story.touch(self.story_id)
+                if public:
+                    SearchDocument.objects.filter(snippet=self).update(
+                        text=self.text
+                    )
+
+        if self.version != old_version:
+            cache.delete_many([
+                self.get_fragment_cache_key(kind, old_version)
+                for kind in self.fragment_kinds
+            ])
+        self._loaded_values = {
+            'text': self.text, 'edited': self.edited, 'version': self.version
+        }
+
+
+@receiver(post_delete, sender=Snippet)
+def delete_snippet_fragments(sender, instance, **kwargs):
+    cache.delete_many([
+        instance.get_fragment_cache_key(kind)
+        for kind in instance.fragment_kinds
+    ])
+
+
+class PrintableSnapshot(models.Model):
+    """
+    The printable version of a story as of one story version: the rendered
+    story body, and the whole page as anonymous readers of a shareable link
+    get it, gzipped. A snapshot older than its story is rebuilt on the next
+    request.
+    """
+    story = models.OneToOneField(
+        Story, on_delete=models.CASCADE, primary_key=True
+    )
+    version = models.PositiveIntegerField()
+    body = models.TextField()
+    page_gzip = models.BinaryField()
+    rendered = models.DateTimeField(auto_now=True)
+
+
+class SearchDocument(models.Model):
+    """
+    A piece of text of a public story that search looks into: its title
+    (with no snippet) or one of its snippets.
+
+    The full-text index over text is created in the migrations, as an FTS5
+    table kept in step by triggers on SQLite and as a GIN index on its
+    tsvector on PostgreSQL; see storysharing/search.py.
+    """
+    story = models.ForeignKey(Story, on_delete=models.CASCADE)
+    snippet = models.OneToOneField(
+        Snippet, on_delete=models.CASCADE, null=True, blank=True
+    )
+    text = models.TextField()
+
+    @classmethod
+    def sync_story(cls, story, created=False):
+        """
+        Index a story that is public and isn't indexed yet, and drop the
+        documents of a story that isn't public.
+        """
+        if created:
+            if story.public:
+                cls.objects.create(story=story, text=story.title)
+        elif not story.public:
+            cls.objects.filter(story=story).delete()
+        elif not cls.objects.filter(story=story, snippet=None).exists():
+            cls.index_story(story)
+
+    @classmethod
+    def index_story(cls, story, batch_size=500):
+        cls.objects.filter(story=story).delete()
+        cls.objects.create(story=story, text=story.title)
+        snippets = Snippet.objects.filter(story=story).values_list(
+            'pk', 'text'
+        ).iterator(chunk_size=batch_size)
+        documents = []
+        for snippet_id, text in snippets:
+            documents.append(cls(
+                story=story, snippet_id=snippet_id, text=text
+            ))
+            if len(documents) >= batch_size:
+                cls.objects.bulk_create(documents)
+                documents = []
+        cls.objects.bulk_create(documents)
 
 
 class StoryWriter(models.Model):
     story = models.ForeignKey(Story, on_delete=models.CASCADE)
     writer = models.ForeignKey(User, on_delete=models.CASCADE)
     active = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('story', 'writer')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Keep the active writer count of the story in step when the row is
+        added active or its active flag changes.
+        """
+        was_active = getattr(self, '_loaded_values', {}).get('active', False)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if self.active != was_active:
+                Story.add_active_writers(
+                    [self.story_id], 1 if self.active else -1
+                )
+        self._loaded_values = {'active': self.active}
+
+    def set_active(self, active):
+        """
+        Set the active flag with a conditional UPDATE, so that concurrent
+        requests toggling it count once.
+
+        Return True when the story became available, False when it stopped
+        being available and None when that didn't change.
+        """
+        with transaction.atomic():
+            changed = StoryWriter.objects.filter(pk=self.pk).exclude(
+                active=active
+            ).update(active=active)
+            self.active = active
+            self._loaded_values = {'active': active}
+            if not changed:
+                return None
+            Story.add_active_writers([self.story_id], 1 if active else -1)
+            available, unavailable = Story.update_availability(
+                [self.story_id]
+            )
+        if available:
+            return True
+        if unavailable:
+            return False
+        return None
+
+    @classmethod
+    def set_active_stories(cls, writer, story_ids, active_story_ids):
+        """
+        Set the writer active in the stories of active_story_ids and
+        inactive in the rest of story_ids, in one transaction and with one
+        UPDATE each way.
+
+        Return the pks of the stories that became available and of those
+        that stopped being available, as Story.update_availability does.
+        """
+        with transaction.atomic():
+            rows = cls.objects.select_for_update().filter(
+                writer=writer, story_id__in=story_ids
+            ).values_list('pk', 'story_id', 'active')
+            changes = {True: {}, False: {}}
+            for pk, story_id, active in rows:
+                if active != (story_id in active_story_ids):
+                    changes[not active][pk] = story_id
+
+            for active, ids in changes.items():
+                if ids:
+                    cls.objects.filter(pk__in=ids).update(active=active)
+                    Story.add_active_writers(
+                        ids.values(), 1 if active else -1
+                    )
+            return Story.update_availability(
+                list(changes[True].values()) + list(changes[False].values())
+            )
+
+    @classmethod
+    def get_public_story_ids(cls, username):
+        """
+        Return the ids of the public stories of the writer with username, as
+        a subquery joining the (story, writer) rows to the user's unique
+        username; it is empty when there is no such writer.
+        """
+        return cls.objects.filter(
+            writer__username=username, story__public=True
+        ).values('story_id')
+
+
+@receiver(post_save, sender=StoryWriter)
+@receiver(post_delete, sender=StoryWriter)
+def bump_catalog_for_writers(sender, instance, **kwargs):
+    # The public stories listing shows the writers of every story.
+    if kwargs.get('created', True):
+        Story.bump_catalog_version()
+
+
+@receiver(post_delete, sender=StoryWriter)
+def forget_active_writer(sender, instance, **kwargs):
+    if getattr(instance, '_loaded_values', {}).get('active', False):
+        Story.add_active_writers([instance.story_id], -1)
+
+
+class StoryUpdate(models.Model):
+    writer = models.ForeignKey(User, on_delete=models.CASCADE)
+    story = models.ForeignKey(Story, on_delete=models.CASCADE)
+    text = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+
+
+class OutgoingEmail(models.Model):
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to_email = models.EmailField()
+    created = models.DateTimeField(auto_now_add=True)
+    send_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['sent', 'send_after'])]
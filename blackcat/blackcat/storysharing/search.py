@@ -0,0 +1,117 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from .models import SearchDocument, Story
+
+WORD = re.compile(r'\w+')
+
+# Only the newest SEARCH_MAX_CANDIDATES matching documents are ranked and
+# grouped into stories. FTS5 and GIN indexes find those in order without
+# scoring every match, so a word found in most snippets costs about as much
+# to search as a rare one; the best story is then the best of the latest.
+
+# SQLite returns the bare columns of the row that holds MIN(rank), which
+# is the best matching document of each story; FTS5 ranks with bm25, where
+# lower is better.
+SQLITE_SEARCH = """
+    SELECT story_id, snippet_id, text, MIN(rank) AS score FROM (
+        SELECT document.story_id, document.snippet_id, document.text,
+            candidate.rank
+        FROM (
+            SELECT rowid, rank FROM storysharing_searchdocument_fts
+            WHERE storysharing_searchdocument_fts MATCH %s
+            ORDER BY rowid DESC
+            LIMIT %s
+        ) candidate
+        JOIN storysharing_searchdocument document
+            ON document.id = candidate.rowid
+        JOIN storysharing_story story ON story.id = document.story_id
+        WHERE story.public
+    )
+    GROUP BY story_id
+    ORDER BY score, story_id
+    LIMIT %s OFFSET %s
+"""
+
+# to_tsvector('english', text) must match the GIN index expression for
+# the index to be used.
+POSTGRESQL_SEARCH = """
+    SELECT story_id, snippet_id, text, score FROM (
+        SELECT story_id, snippet_id, text, score,
+            row_number() OVER (
+                PARTITION BY story_id ORDER BY score DESC
+            ) AS position
+        FROM (
+            SELECT story_id, snippet_id, text,
+                ts_rank(to_tsvector('english', text), query) AS score
+            FROM (
+                SELECT document.story_id, document.snippet_id,
+                    document.text, query
+                FROM storysharing_searchdocument document
+                JOIN storysharing_story story
+                    ON story.id = document.story_id,
+                    plainto_tsquery('english', %s) query
+                WHERE to_tsvector('english', document.text) @@ query
+                    AND story.public
+                ORDER BY document.id DESC
+                LIMIT %s
+            ) candidate
+        ) scored
+    ) ranked
+    WHERE position = 1
+    ORDER BY score DESC, story_id
+    LIMIT %s OFFSET %s
+"""
+
+
+def search_documents(words, limit, offset):
+    """
+    Return (story id, snippet id, text) of the best matching document of
+    each public story that has all words, best stories first. Stories are
+    taken from the newest SEARCH_MAX_CANDIDATES matching documents only.
+    """
+    if connection.vendor == 'sqlite':
+        query = " ".join('"{}"'.format(word) for word in words)
+        sql = SQLITE_SEARCH
+    elif connection.vendor == 'postgresql':
+        query = " ".join(words)
+        sql = POSTGRESQL_SEARCH
+    else:
+        # No full-text index on other databases: plain, unranked matching.
+        documents = SearchDocument.objects.filter(story__public=True)
+        for word in words:
+            documents = documents.filter(text__icontains=word)
+        story_ids = documents.order_by('story_id').values_list(
+            'story_id', flat=True
+        ).distinct()[offset:offset + limit]
+        return [(story_id, None, None) for story_id in story_ids]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql, [query, settings.SEARCH_MAX_CANDIDATES, limit, offset]
+        )
+        return [row[:3] for row in cursor.fetchall()]
+
+
+def search_stories(terms, page, per_page):
+    """
+    Return a page of public stories matching the search terms, as dicts of
+    the story and the text of its best matching snippet (None when the
+    title matched best), and whether there are more pages.
+    """
+    words = WORD.findall(terms.lower())
+    if not words:
+        return [], False
+
+    rows = search_documents(words, per_page + 1, (page - 1) * per_page)
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    stories = Story.objects.in_bulk([story_id for story_id, _, _ in rows])
+    return [
+        {
+            'story': stories[story_id],
+            'excerpt': text if snippet_id is not None else None
+        }
+        for story_id, snippet_id, text in rows if story_id in stories
+    ], has_next
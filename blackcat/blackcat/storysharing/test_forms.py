@@ -1,6 +1,6 @@
 from .forms import (
-    StartStoryForm, StoryWriterActiveForm, CreateSnippetForm,
-    StorySettingsForm, SnippetEditForm
+    StartStoryForm, StoryWriterActiveForm, StoryWriterBulkActiveForm,
+    CreateSnippetForm, StorySettingsForm, SnippetEditForm
 )
 from .models import Story, StoryWriter, Snippet
 from django.contrib.admin.widgets import FilteredSelectMultiple
@@ -63,6 +63,30 @@ class StoryWriterActiveFormTest(TestCase):
         )
 
 
+class StoryWriterBulkActiveFormTest(TestCase):
+
+    def test_validation(self):
+        stories = [
+            Story.objects.create(title="Story {}".format(number))
+            for number in range(2)
+        ]
+        form = StoryWriterBulkActiveForm({
+            'story': [story.pk for story in stories],
+            'active': [stories[0].pk]
+        })
+        self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.cleaned_data['active']), stories[:1])
+
+        form = StoryWriterBulkActiveForm({'story': [stories[0].pk]})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.cleaned_data['active']), [])
+
+        self.assertFalse(StoryWriterBulkActiveForm({}).is_valid())
+        self.assertFalse(StoryWriterBulkActiveForm({
+            'story': [stories[0].pk], 'active': ["many"]
+        }).is_valid())
+
+
 class CreateSnippetFormTest(TestCase):
 
     def test_meta_content(self):
@@ -0,0 +1,189 @@
+import datetime
+import smtplib
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from io import StringIO
+from unittest.mock import patch
+from .mail import queue_digests, queue_mail, send_queued_mail
+from .models import OutgoingEmail, Story, StoryUpdate, User
+
+
+class QueueMailTest(TestCase):
+
+    def test_one_email_per_recipient(self):
+        queue_mail(
+            "A subject", "A body", "from@email.com",
+            ["one@email.com", "two@email.com"]
+        )
+        queued = OutgoingEmail.objects.order_by('pk')
+        self.assertEqual(
+            [x.to_email for x in queued], ["one@email.com", "two@email.com"]
+        )
+        for email in queued:
+            self.assertEqual(email.subject, "A subject")
+            self.assertEqual(email.body, "A body")
+            self.assertEqual(email.from_email, "from@email.com")
+            self.assertEqual(email.attempts, 0)
+            self.assertIsNone(email.sent)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_single_insert_for_all_recipients(self):
+        with self.assertNumQueries(1):
+            queue_mail(
+                "A subject", "A body", "from@email.com",
+                ["writer{}@email.com".format(x) for x in range(50)]
+            )
+        self.assertEqual(OutgoingEmail.objects.count(), 50)
+
+
+@override_settings(
+    EMAIL_OUTBOX_BATCH_SIZE=2,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_DELAY=60
+)
+class SendQueuedMailTest(TestCase):
+
+    def test_sends_due_emails_in_batches(self):
+        queue_mail(
+            "A subject", "A body", "from@email.com",
+            ["one@email.com", "two@email.com", "three@email.com"]
+        )
+        self.assertEqual(send_queued_mail(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ["one@email.com"])
+        self.assertEqual(mail.outbox[0].subject, "A subject")
+        self.assertEqual(mail.outbox[0].body, "A body")
+        self.assertEqual(mail.outbox[0].from_email, "from@email.com")
+
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(send_queued_mail(), (0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(sent__isnull=True).count(), 0
+        )
+
+    def test_emails_not_due_are_not_sent(self):
+        queue_mail("A subject", "A body", "from@email.com", ["a@email.com"])
+        OutgoingEmail.objects.update(
+            send_after=timezone.now() + datetime.timedelta(minutes=5)
+        )
+        self.assertEqual(send_queued_mail(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_failed_emails_backoff_and_give_up(self):
+        queue_mail("A subject", "A body", "from@email.com", ["a@email.com"])
+        with patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=smtplib.SMTPException("Server hiccup")
+        ):
+            self.assertEqual(send_queued_mail(), (0, 1))
+            email = OutgoingEmail.objects.get()
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, "Server hiccup")
+            self.assertIsNone(email.sent)
+            self.assertGreater(email.send_after, timezone.now())
+            first_delay = email.send_after - email.created
+
+            self.assertEqual(send_queued_mail(), (0, 0))
+
+            OutgoingEmail.objects.update(send_after=timezone.now())
+            self.assertEqual(send_queued_mail(), (0, 1))
+            email = OutgoingEmail.objects.get()
+            self.assertEqual(email.attempts, 2)
+            self.assertGreater(
+                email.send_after - timezone.now(), first_delay
+            )
+
+            OutgoingEmail.objects.update(send_after=timezone.now())
+            self.assertEqual(send_queued_mail(), (0, 1))
+
+        OutgoingEmail.objects.update(send_after=timezone.now())
+        self.assertEqual(send_queued_mail(), (0, 0))
+        self.assertEqual(OutgoingEmail.objects.get().attempts, 3)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_connection_failure_defers_whole_batch(self):
+        queue_mail(
+            "A subject", "A body", "from@email.com",
+            ["one@email.com", "two@email.com"]
+        )
+        with patch(
+            'django.core.mail.backends.locmem.EmailBackend.open',
+            side_effect=OSError("Connection refused")
+        ):
+            self.assertEqual(send_queued_mail(), (0, 2))
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, "Connection refused")
+            self.assertIsNone(email.sent)
+
+    @override_settings(
+        EMAIL_OUTBOX_BATCH_SIZE=10, EMAIL_MESSAGES_PER_CONNECTION=4
+    )
+    def test_connection_reused_up_to_the_cap(self):
+        queue_mail(
+            "A subject", "A body", "from@email.com",
+            ["writer{}@email.com".format(x) for x in range(10)]
+        )
+        with patch(
+            'django.core.mail.backends.locmem.EmailBackend.open'
+        ) as mock_open:
+            self.assertEqual(send_queued_mail(), (10, 0))
+        self.assertEqual(mock_open.call_count, 3)
+        self.assertEqual(len(mail.outbox), 10)
+
+    def test_command_drains_outbox(self):
+        queue_mail(
+            "A subject", "A body", "from@email.com",
+            ["one@email.com", "two@email.com", "three@email.com"]
+        )
+        out = StringIO()
+        call_command('send_queued_mail', stdout=out)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn("Sent 3 emails, 0 failed.", out.getvalue())
+
+
+class QueueDigestsTest(TestCase):
+
+    def test_one_digest_per_writer(self):
+        user = User.objects.create(
+            username="randomuser", email="random@email.com",
+            digest_updates=True
+        )
+        other_user = User.objects.create(
+            username="otheruser", email="other@email.com",
+            digest_updates=True
+        )
+        story = Story.objects.create(title="The lost kitten")
+        other_story = Story.objects.create(title="The found kitten")
+        for text in ["First update", "Second update"]:
+            StoryUpdate.objects.create(writer=user, story=story, text=text)
+        StoryUpdate.objects.create(
+            writer=user, story=other_story, text="Other story update"
+        )
+        StoryUpdate.objects.create(
+            writer=other_user, story=story, text="First update"
+        )
+
+        out = StringIO()
+        call_command('send_digests', stdout=out)
+        self.assertIn("Queued 2 digests.", out.getvalue())
+        self.assertEqual(StoryUpdate.objects.count(), 0)
+
+        digest = OutgoingEmail.objects.get(to_email=user.email)
+        self.assertEqual(digest.subject, "Black Cat Story Sharing - Updates")
+        self.assertIn(
+            "\"The Lost Kitten\":\n- First update\n- Second update\n",
+            digest.body
+        )
+        self.assertIn(
+            "\"The Found Kitten\":\n- Other story update\n", digest.body
+        )
+        other_digest = OutgoingEmail.objects.get(to_email=other_user.email)
+        self.assertNotIn("The Found Kitten", other_digest.body)
+
+        self.assertEqual(queue_digests(), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 2)
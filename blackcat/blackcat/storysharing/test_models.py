@@ -1,5 +1,15 @@
-from django.db import models
+import datetime
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, models
 from django.test import TestCase
+from django.utils import timezone
+from io import StringIO
+from unittest.mock import patch
+from . import fragments
+from .fragments import render_snippet_fragments
 from .models import Story, Snippet, User, StoryWriter
 
 
@@ -8,10 +18,18 @@ class StoryTest(TestCase):
     def test_fields(self):
         expected_fields = {
             'title': models.CharField,
+            'slug': models.SlugField,
             'writers': models.ManyToManyField,
             'public': models.BooleanField,
             'available': models.BooleanField,
-            'shareable': models.BooleanField
+            'active_writer_count': models.PositiveIntegerField,
+            'shareable': models.BooleanField,
+            'version': models.PositiveIntegerField,
+            'last_modified': models.DateTimeField,
+            'snippet_count': models.PositiveIntegerField,
+            'last_snippet': models.ForeignKey,
+            'last_author': models.ForeignKey,
+            'last_activity': models.DateTimeField
         }
 
         for field in expected_fields:
@@ -24,6 +42,7 @@ class StoryTest(TestCase):
         self.assertEqual(no_fields, len(expected_fields) + 1)
 
         self.assertEqual(Story._meta.get_field('title').max_length, 100)
+        self.assertTrue(Story._meta.get_field('slug').db_index)
 
         self.assertEqual(Story._meta.get_field('writers').related_model, User)
         self.assertTrue(hasattr(Story, 'storywriter_set'))
@@ -32,6 +51,136 @@ class StoryTest(TestCase):
 
         self.assertEqual(Story._meta.get_field('shareable').default, False)
 
+    def test_indexes_exist_after_migrations(self):
+        # Later migrations may rebuild the table (SQLite does on AddField);
+        # the indexes of the model state must come back with it.
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Story._meta.db_table
+            )
+        self.assertTrue(Story._meta.indexes)
+        for index in Story._meta.indexes:
+            self.assertIn(index.name, constraints)
+            self.assertEqual(constraints[index.name]['columns'], [
+                Story._meta.get_field(name).column for name in index.fields
+            ])
+
+    def test_version_moves_forward_on_changes(self):
+        story = Story.objects.create(title="A story")
+        self.assertEqual(story.version, 1)
+        stale_story = Story.objects.get(pk=story.pk)
+
+        snippet = Snippet.objects.create(story=story, text="Once upon a time")
+        self.assertEqual(Story.objects.get(pk=story.pk).version, 2)
+
+        snippet.text = "Once upon a time, a cat"
+        snippet.save()
+        self.assertEqual(Story.objects.get(pk=story.pk).version, 3)
+
+        stale_story.public = True
+        stale_story.save()
+        refetched_story = Story.objects.get(pk=story.pk)
+        self.assertEqual(refetched_story.version, 4)
+        self.assertTrue(refetched_story.public)
+        self.assertGreater(refetched_story.last_modified, story.last_modified)
+
+    def test_turn_state_maintained_on_new_snippets(self):
+        user = User.objects.create(username="writer", email="w@email.com")
+        story = Story.objects.create(title="A story")
+        self.assertEqual(story.snippet_count, 0)
+        self.assertIsNone(story.last_snippet)
+        self.assertIsNone(story.last_activity)
+
+        Snippet.objects.create(story=story, text="Once upon a time")
+        snippet = Snippet.objects.create(
+            story=story, author=user, text="there was a cat"
+        )
+        snippet.text = "there was a dog"
+        snippet.save()
+
+        story = Story.objects.get(pk=story.pk)
+        self.assertEqual(story.snippet_count, 2)
+        self.assertEqual(story.last_snippet, snippet)
+        self.assertEqual(story.last_author, user)
+        self.assertIsNotNone(story.last_activity)
+
+        story.title = "A renamed story"
+        story.save()
+        self.assertEqual(Story.objects.get(pk=story.pk).snippet_count, 2)
+
+    def test_rebuild_story_stats(self):
+        user = User.objects.create(username="writer", email="w@email.com")
+        story = Story.objects.create(title="A story")
+        empty_story = Story.objects.create(title="An empty story")
+        Snippet.objects.create(story=story, text="Once upon a time")
+        snippet = Snippet.objects.create(
+            story=story, author=user, text="there was a cat"
+        )
+        Story.objects.update(
+            snippet_count=7, last_snippet=None, last_author=None,
+            last_activity=None
+        )
+
+        out = StringIO()
+        call_command('rebuild_story_stats', stdout=out)
+        self.assertIn("Rebuilt the stats of 2 stories.", out.getvalue())
+        story = Story.objects.get(pk=story.pk)
+        self.assertEqual(story.snippet_count, 2)
+        self.assertEqual(story.last_snippet, snippet)
+        self.assertEqual(story.last_author, user)
+        self.assertIsNotNone(story.last_activity)
+        empty_story = Story.objects.get(pk=empty_story.pk)
+        self.assertEqual(empty_story.snippet_count, 0)
+        self.assertIsNone(empty_story.last_snippet)
+        self.assertIsNone(empty_story.last_activity)
+
+    def test_rebuild_story_stats_moves_changed_stories_on(self):
+        story = Story.objects.create(title="A story")
+        untouched = Story.objects.create(title="An untouched story")
+        Snippet.objects.create(story=untouched, text="All is well")
+        first = Snippet.objects.create(story=story, text="Once upon a time")
+        last = Snippet.objects.create(story=story, text="there was a cat")
+        changed = timezone.now() - datetime.timedelta(days=3)
+        Story.objects.filter(pk=story.pk).update(
+            last_snippet=first, last_activity=timezone.now(),
+            last_modified=changed
+        )
+        versions = dict(Story.objects.values_list('pk', 'version'))
+
+        out = StringIO()
+        call_command('rebuild_story_stats', stdout=out)
+        self.assertIn("Rebuilt the stats of 1 stories.", out.getvalue())
+        story = Story.objects.get(pk=story.pk)
+        self.assertEqual(story.last_snippet, last)
+        self.assertEqual(story.last_activity, changed)
+        self.assertEqual(story.version, versions[story.pk] + 1)
+        self.assertEqual(
+            Story.objects.get(pk=untouched.pk).version, versions[untouched.pk]
+        )
+
+    def test_active_writer_emails(self):
+        story = Story.objects.create(title="A quiet story")
+        for number in range(3):
+            writer = User.objects.create(
+                username="writer{}".format(number),
+                email="writer{}@email.com".format(number)
+            )
+            StoryWriter.objects.create(
+                story=story, writer=writer, active=number != 1
+            )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                sorted(story.get_active_writer_emails()),
+                ["writer0@email.com", "writer2@email.com"]
+            )
+            self.assertEqual(len(story.get_active_writers()), 2)
+
+        StoryWriter.objects.filter(story=story).update(active=True)
+        self.assertEqual(len(story.get_active_writer_emails()), 2)
+        story.clear_active_writers()
+        self.assertEqual(len(story.get_active_writer_emails()), 3)
+
 
 class SnippetTest(TestCase):
 
@@ -40,7 +189,9 @@ class SnippetTest(TestCase):
             'story': models.ForeignKey,
             'author': models.ForeignKey,
             'text': models.TextField,
-            'edited': models.BooleanField
+            'edited': models.BooleanField,
+            'version': models.PositiveIntegerField,
+            'story_version': models.PositiveIntegerField
         }
 
         for field in expected_fields:
@@ -75,6 +226,76 @@ class SnippetTest(TestCase):
 
         self.assertEqual(Snippet._meta.get_field('edited').default, False)
 
+        self.assertEqual(Snippet._meta.get_field('version').default, 1)
+
+    def test_version_bumped_when_content_changes(self):
+        story = Story.objects.create(title="A story")
+        snippet = Snippet.objects.create(story=story, text="Once upon a time")
+        self.assertEqual(snippet.version, 1)
+
+        snippet = Snippet.objects.get(pk=snippet.pk)
+        snippet.save()
+        self.assertEqual(Snippet.objects.get(pk=snippet.pk).version, 1)
+
+        cache.set(snippet.get_fragment_cache_key('display'), "Old fragment")
+        snippet.text = "Once upon a time, there was a cat"
+        snippet.edited = True
+        snippet.save()
+        self.assertEqual(Snippet.objects.get(pk=snippet.pk).version, 2)
+        self.assertIsNone(cache.get(
+            snippet.get_fragment_cache_key('display', version=1)
+        ))
+
+        snippet.save()
+        self.assertEqual(Snippet.objects.get(pk=snippet.pk).version, 2)
+
+    def test_story_version_recorded_on_changes(self):
+        story = Story.objects.create(title="A story")
+        snippet = Snippet.objects.create(story=story, text="Once upon a time")
+        story.refresh_from_db()
+        self.assertEqual(snippet.story_version, story.version)
+
+        story.save()
+        snippet.save()
+        self.assertEqual(
+            Snippet.objects.get(pk=snippet.pk).story_version,
+            story.version
+        )
+
+        snippet.text = "Once upon a time, there was a cat"
+        snippet.save(update_fields=['text'])
+        story.refresh_from_db()
+        self.assertEqual(
+            Snippet.objects.get(pk=snippet.pk).story_version,
+            story.version
+        )
+
+    def test_fragments_of_long_story_stay_cached(self):
+        story = Story.objects.create(title="A long story")
+        Snippet.objects.bulk_create([
+            Snippet(story=story, text="Part {}".format(number))
+            for number in range(1000)
+        ])
+        snippets = list(Snippet.objects.filter(story=story))
+        cache.clear()
+        for kind in Snippet.fragment_kinds:
+            render_snippet_fragments(snippets, kind)
+
+        with patch.object(
+            fragments, 'render_to_string', wraps=fragments.render_to_string
+        ) as render:
+            for kind in Snippet.fragment_kinds:
+                render_snippet_fragments(snippets, kind)
+        self.assertEqual(render.call_count, 0)
+
+    def test_fragments_deleted_with_snippet(self):
+        story = Story.objects.create(title="A story")
+        snippet = Snippet.objects.create(story=story, text="Once upon a time")
+        key = snippet.get_fragment_cache_key('printable')
+        cache.set(key, "Fragment")
+        story.delete()
+        self.assertIsNone(cache.get(key))
+
 
 class StoryWriterTest(TestCase):
 
@@ -111,3 +332,85 @@ class StoryWriterTest(TestCase):
             StoryWriter._meta.get_field('writer').remote_field.on_delete,
             models.CASCADE
         )
+
+        self.assertEqual(
+            StoryWriter._meta.unique_together, (('story', 'writer'),)
+        )
+
+    def test_get_storywriter(self):
+        user = User.objects.create(username="writer", email="w@email.com")
+        other_user = User.objects.create(username="other", email="o@email.com")
+        story = Story.objects.create(title="A story")
+        storywriter = StoryWriter.objects.create(story=story, writer=user)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(story.get_storywriter(user), storywriter)
+            self.assertTrue(story.has_writer(user))
+            self.assertIsNone(story.get_storywriter(other_user))
+            self.assertFalse(story.has_writer(other_user))
+
+        with self.assertNumQueries(0):
+            self.assertFalse(story.has_writer(AnonymousUser()))
+
+    def test_active_writer_count_kept_in_step(self):
+        users = [
+            User.objects.create(
+                username="writer{}".format(number),
+                email="writer{}@email.com".format(number)
+            )
+            for number in range(3)
+        ]
+        story = Story.objects.create(title="A story")
+        StoryWriter.objects.create(story=story, writer=users[0], active=True)
+        storywriter = StoryWriter.objects.create(story=story, writer=users[1])
+        other = StoryWriter.objects.create(story=story, writer=users[2])
+
+        def count():
+            return Story.objects.get(pk=story.pk).active_writer_count
+
+        self.assertEqual(count(), 1)
+        storywriter.active = True
+        storywriter.save()
+        storywriter.save()
+        self.assertEqual(count(), 2)
+        StoryWriter.objects.get(pk=storywriter.pk).delete()
+        self.assertEqual(count(), 1)
+        other.set_active(True)
+        other.set_active(True)
+        self.assertEqual(count(), 2)
+
+    def test_set_active_flips_availability_once(self):
+        users = [
+            User.objects.create(
+                username="writer{}".format(number),
+                email="writer{}@email.com".format(number)
+            )
+            for number in range(3)
+        ]
+        story = Story.objects.create(title="A story")
+        storywriters = [
+            StoryWriter.objects.create(story=story, writer=user)
+            for user in users
+        ]
+
+        def available():
+            return Story.objects.get(pk=story.pk).available
+
+        self.assertIsNone(storywriters[0].set_active(True))
+        self.assertFalse(available())
+        self.assertTrue(storywriters[1].set_active(True))
+        self.assertTrue(available())
+        self.assertIsNone(storywriters[1].set_active(True))
+        self.assertIsNone(storywriters[2].set_active(True))
+        self.assertIsNone(storywriters[0].set_active(False))
+        self.assertTrue(available())
+        self.assertFalse(storywriters[1].set_active(False))
+        self.assertFalse(available())
+
+        # A stale copy of the row doesn't count the same change twice.
+        stale = StoryWriter.objects.get(pk=storywriters[2].pk)
+        self.assertIsNone(storywriters[2].set_active(False))
+        self.assertIsNone(stale.set_active(False))
+        self.assertEqual(
+            Story.objects.get(pk=story.pk).active_writer_count, 0
+        )
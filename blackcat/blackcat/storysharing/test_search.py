@@ -0,0 +1,133 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from .models import User, Story, Snippet, SearchDocument
+from .search import search_stories
+from . import views
+
+
+class SearchStoriesTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username="searcher", email="searcher@email.com"
+        )
+
+    def create_story(self, title, texts, public=True):
+        story = Story.objects.create(title=title, public=public)
+        for text in texts:
+            Snippet.objects.create(story=story, author=self.user, text=text)
+        return story
+
+    def search(self, terms, page=1, per_page=10):
+        results, has_next = search_stories(terms, page, per_page)
+        return [result['story'] for result in results]
+
+    def test_finds_public_titles_and_snippets(self):
+        moon = self.create_story("The moon rabbit", ["It jumped at night"])
+        sea = self.create_story("Sea tales", ["A rabbit sailed away"])
+        self.create_story("Secret rabbit", ["Hidden rabbit"], public=False)
+
+        self.assertEqual(set(self.search("rabbit")), {moon, sea})
+        self.assertEqual(self.search("jumped"), [moon])
+        self.assertEqual(self.search("sailed rabbit"), [sea])
+        self.assertEqual(self.search("sailed night"), [])
+
+        results, has_next = search_stories("sailed", 1, 10)
+        self.assertEqual(results[0]['excerpt'], "A rabbit sailed away")
+        results, has_next = search_stories("moon", 1, 10)
+        self.assertIsNone(results[0]['excerpt'])
+
+    def test_best_matches_first_and_paginated(self):
+        stories = [
+            self.create_story("Tale {}".format(number), [
+                " ".join(["cat"] * number + ["dog"] * (10 - number))
+            ])
+            for number in range(1, 6)
+        ]
+        self.assertEqual(self.search("cat"), stories[::-1])
+
+        results, has_next = search_stories("cat", 1, 2)
+        self.assertTrue(has_next)
+        results, has_next = search_stories("cat", 3, 2)
+        self.assertEqual([result['story'] for result in results], [
+            stories[0]
+        ])
+        self.assertFalse(has_next)
+
+    def test_only_newest_candidates_ranked(self):
+        stories = [
+            self.create_story("Tale {}".format(number), [
+                " ".join(["cat"] * number + ["dog"] * (10 - number))
+            ])
+            for number in range(1, 6)
+        ]
+        with self.settings(SEARCH_MAX_CANDIDATES=3):
+            self.assertEqual(self.search("cat"), stories[:1:-1])
+            results, has_next = search_stories("cat", 1, 2)
+            self.assertTrue(has_next)
+            results, has_next = search_stories("cat", 2, 2)
+            self.assertEqual([result['story'] for result in results], [
+                stories[2]
+            ])
+            self.assertFalse(has_next)
+
+        Snippet.objects.create(story=stories[0], author=self.user, text="Cat")
+        with self.settings(SEARCH_MAX_CANDIDATES=1):
+            self.assertEqual(self.search("cat"), [stories[0]])
+
+    def test_index_follows_snippets_and_public_flag(self):
+        story = self.create_story("A tale", ["Once upon a time"])
+        snippet = Snippet.objects.get()
+        snippet.text = "Once upon a dragon"
+        snippet.save()
+        self.assertEqual(self.search("time"), [])
+        self.assertEqual(self.search("dragon"), [story])
+
+        story.public = False
+        story.save()
+        self.assertEqual(SearchDocument.objects.count(), 0)
+        Snippet.objects.create(story=story, author=self.user, text="Knight")
+        self.assertEqual(self.search("dragon"), [])
+
+        story.public = True
+        story.save()
+        self.assertEqual(self.search("dragon"), [story])
+        self.assertEqual(self.search("knight"), [story])
+
+        snippet.delete()
+        self.assertEqual(self.search("dragon"), [])
+
+    def test_terms_are_not_query_syntax(self):
+        story = self.create_story("Quotes", ['She said "NEAR" OR not'])
+        self.assertEqual(self.search('"near" OR'), [story])
+        self.assertEqual(self.search('*) AND (" NOT'), [])
+        self.assertEqual(self.search("  ...  "), [])
+
+
+class SearchViewTest(TestCase):
+
+    def test_search_page(self):
+        user = User.objects.create(username="writer", email="w@email.com")
+        for number in range(3):
+            story = Story.objects.create(
+                title="Ghost story {}".format(number), public=True
+            )
+            Snippet.objects.create(story=story, author=user, text="Boo")
+
+        response = self.client.get(reverse('search'))
+        self.assertContains(response, "Search Public Stories")
+        self.assertNotContains(response, "No public stories match")
+
+        with patch.object(views, 'SEARCH_RESULTS_PER_PAGE', 2):
+            response = self.client.get(reverse('search') + "?q=ghost")
+            self.assertEqual(len(response.context['results']), 2)
+            self.assertContains(response, "?q=ghost&page=2")
+
+            response = self.client.get(reverse('search') + "?q=ghost&page=2")
+            self.assertEqual(len(response.context['results']), 1)
+            self.assertContains(response, "?q=ghost&page=1")
+
+        response = self.client.get(reverse('search') + "?q=vampire")
+        self.assertContains(response, "No public stories match")
@@ -0,0 +1,245 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.urls import reverse
+from blackcat.user_views import CreateUserView, ProfileView
+from .models import User, Story, StoryWriter, Snippet
+from . import views
+
+
+class ConcurrentViewsTest(TransactionTestCase):
+    """
+    Views are hammered from many threads at once, as they are when gunicorn
+    runs threaded workers, and no response may show another request's data.
+    """
+
+    no_threads = 8
+    iterations = 10
+
+    def setUp(self):
+        self.users = []
+        self.stories = {}
+        for number in range(self.no_threads):
+            user = User.objects.create(
+                username="writer{}".format(number),
+                email="writer{}@email.com".format(number)
+            )
+            story = Story.objects.create(
+                title="Story number {}".format(number), available=True
+            )
+            StoryWriter.objects.create(story=story, writer=user, active=True)
+            Snippet.objects.create(
+                story=story, author=user,
+                text="Snippet written by writer{}".format(number)
+            )
+            self.users.append(user)
+            self.stories[user.pk] = story
+
+    def run_concurrently(self, function):
+        errors = []
+        barrier = threading.Barrier(len(self.users))
+
+        def worker(user):
+            try:
+                barrier.wait()
+                for _ in range(self.iterations):
+                    function(user)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(user,))
+            for user in self.users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def assert_only_own_data(self, response, user, template):
+        content = response.content.decode()
+        for other_user in self.users:
+            text = template.format(other_user.username)
+            if other_user == user:
+                assert text in content, "Missing {}".format(text)
+            else:
+                assert text not in content, "Leaked {}".format(text)
+
+    def test_display_story(self):
+        def display_story(user):
+            story = self.stories[user.pk]
+            request = RequestFactory().get(
+                reverse('display_story', kwargs={'id': story.id})
+            )
+            request.user = user
+            response = views.DisplayStoryView.as_view()(request, id=story.id)
+            self.assert_only_own_data(
+                response, user, "Snippet written by {}"
+            )
+
+        self.run_concurrently(display_story)
+
+    def test_profile(self):
+        def profile(user):
+            request = RequestFactory().get(reverse('profile'))
+            request.user = user
+            response = ProfileView.as_view()(request)
+            self.assert_only_own_data(response, user, "{}@email.com")
+
+        self.run_concurrently(profile)
+
+    def test_start_story(self):
+        def start_story(user):
+            number = int(user.username[len("writer"):])
+            if number % 2:
+                request = RequestFactory().post(
+                    reverse('start_story'), data={'writers': 'Eusebio'}
+                )
+            else:
+                request = RequestFactory().get(reverse('start_story'))
+            request.user = user
+            request._dont_enforce_csrf_checks = True
+            response = views.StartStoryView.as_view()(request)
+            errors_shown = "There were some problems" in (
+                response.content.decode()
+            )
+            assert errors_shown == bool(number % 2), "Leaked errors"
+
+        self.run_concurrently(start_story)
+
+    def test_create_user(self):
+        def create_user(user):
+            number = int(user.username[len("writer"):])
+            if number % 2:
+                request = RequestFactory().post(reverse('create_user'), data={
+                    'username': "new{}".format(user.username),
+                    'email': user.email,
+                    'password1': "a password",
+                    'password2': "another password"
+                })
+            else:
+                request = RequestFactory().get(reverse('create_user'))
+            request.user = AnonymousUser()
+            request._dont_enforce_csrf_checks = True
+            response = CreateUserView.as_view()(request)
+            content = response.content.decode()
+            for other_user in self.users:
+                text = "new{}".format(other_user.username)
+                assert (text in content) == (other_user == user and (
+                    number % 2
+                )), "Leaked {}".format(text)
+
+        self.run_concurrently(create_user)
+
+    @unittest.skipUnless(
+        connection.features.has_select_for_update,
+        "Turns are only enforced where story rows can be locked."
+    )
+    def test_turns_taken_on_one_story(self):
+        story = Story.objects.create(title="Shared story", available=True)
+        for user in self.users:
+            StoryWriter.objects.create(story=story, writer=user, active=True)
+
+        def add_snippet(user):
+            request = RequestFactory().post(
+                reverse('display_story', kwargs={'id': story.id}),
+                data={
+                    'story': story.id, 'author': user.id,
+                    'text': "By {}".format(user.username)
+                }
+            )
+            request.user = user
+            request._dont_enforce_csrf_checks = True
+            views.DisplayStoryView.as_view()(request, id=story.id)
+
+        self.run_concurrently(add_snippet)
+
+        authors = list(Snippet.objects.filter(story=story).order_by(
+            'pk'
+        ).values_list('author_id', flat=True))
+        self.assertTrue(authors)
+        for previous, author in zip(authors, authors[1:]):
+            self.assertNotEqual(previous, author)
+        story.refresh_from_db()
+        self.assertEqual(story.snippet_count, len(authors))
+        self.assertEqual(story.last_author_id, authors[-1])
+
+
+class InterleavedTurnsTest(TestCase):
+    """
+    Two posts by one writer are interleaved by hand, so the turn check is
+    proven on databases where threads can't hold the story lock at once.
+    """
+
+    def setUp(self):
+        self.story = Story.objects.create(title="Shared story", available=True)
+        self.users = [
+            User.objects.create(username=username)
+            for username in ("Eusebio", "Mary", "Anna")
+        ]
+        for user in self.users:
+            StoryWriter.objects.create(
+                story=self.story, writer=user, active=True
+            )
+
+    def post_snippet(self, user, text):
+        request = RequestFactory().post(
+            reverse('display_story', kwargs={'id': self.story.id}),
+            data={'story': self.story.id, 'author': user.id, 'text': text}
+        )
+        request.user = user
+        request._dont_enforce_csrf_checks = True
+        return views.DisplayStoryView.as_view()(request, id=self.story.id)
+
+    def test_post_rejected_when_other_post_lands_first(self):
+        user = self.users[0]
+        has_writer = Story.has_writer
+
+        def other_post_lands(story, writer):
+            # The first post commits after this one read the story, but
+            # before this one takes the lock.
+            if not Snippet.objects.filter(story=story).exists():
+                Snippet.objects.create(
+                    story=story, author=user, text="First post"
+                )
+            return has_writer(story, writer)
+
+        with patch.object(
+            Story, 'has_writer', autospec=True, side_effect=other_post_lands
+        ), patch.object(
+            QuerySet, 'select_for_update', autospec=True,
+            side_effect=QuerySet.select_for_update
+        ) as select_for_update:
+            response = self.post_snippet(user, "Second post")
+
+        self.assertIn(
+            "You added the last snippet.", response.content.decode()
+        )
+        self.assertIn(Story, [
+            call[0][0].model for call in select_for_update.call_args_list
+        ])
+        self.assertEqual(list(Snippet.objects.filter(
+            story=self.story
+        ).values_list('text', flat=True)), ["First post"])
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.snippet_count, 1)
+
+    def test_posts_by_different_writers_both_added(self):
+        self.post_snippet(self.users[0], "First post")
+        self.post_snippet(self.users[1], "Second post")
+
+        self.assertEqual(list(Snippet.objects.filter(
+            story=self.story
+        ).order_by('pk').values_list('author_id', flat=True)), [
+            self.users[0].id, self.users[1].id
+        ])
+        self.story.refresh_from_db()
+        self.assertEqual(self.story.last_author_id, self.users[1].id)
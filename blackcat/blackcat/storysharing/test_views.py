@@ -1,10 +1,23 @@
+import gzip
+
 from blackcat.settings import SITE_DOMAIN, EMAIL_HOST_USER
 from django.contrib.auth import login
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache, caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.module_loading import import_string
 from django.utils.text import slugify
-from django.test import TestCase, RequestFactory
-from unittest.mock import patch, call
-from .models import User, Story, StoryWriter, Snippet
+from django.test import TestCase, TransactionTestCase, RequestFactory
+from unittest import skipUnless
+from unittest.mock import patch
+from .models import (
+    User, Story, StoryWriter, Snippet, OutgoingEmail, StoryUpdate,
+    PrintableSnapshot
+)
+from .fragments import get_versioned_fragment
 from .urls import urlpatterns
 from . import views
 
@@ -47,6 +60,78 @@ class IndexViewTest(TestCase):
 
 class PrintableStoryViewTest(TestCase):
 
+    def setUp(self):
+        cache.clear()
+
+    def test_served_from_snapshot_of_current_version(self):
+        user = create_random_user()
+        story = Story.objects.create(title="Shared tale", shareable=True)
+        Snippet.objects.create(story=story, author=user, text="First part")
+        url = reverse('printable_story', kwargs={
+            'pk': story.pk, 'title': slugify(story.title)
+        })
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b"First part", gzip.decompress(response.content))
+        story.refresh_from_db()
+        snapshot = PrintableSnapshot.objects.get(story=story)
+        self.assertEqual(snapshot.version, story.version)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertContains(response, "First part")
+
+        Snippet.objects.create(story=story, author=user, text="Second part")
+        response = self.client.get(url)
+        self.assertContains(response, "Second part")
+        story.refresh_from_db()
+        self.assertEqual(
+            PrintableSnapshot.objects.get(story=story).version, story.version
+        )
+
+    def test_gzip_page_has_its_own_etag(self):
+        story = Story.objects.create(title="Shared tale", shareable=True)
+        url = reverse('printable_story', kwargs={
+            'pk': story.pk, 'title': slugify(story.title)
+        })
+
+        gzip_response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        plain_response = self.client.get(url)
+        self.assertEqual(gzip_response['Content-Encoding'], 'gzip')
+        self.assertTrue(gzip_response['ETag'].endswith('-gzip"'))
+        self.assertNotEqual(gzip_response['ETag'], plain_response['ETag'])
+        self.assertIn('Accept-Encoding', plain_response['Vary'])
+
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=gzip_response['ETag'],
+            HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=gzip_response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_slug_only_link_redirects(self):
+        story = Story.objects.create(title="Only One Of Its Kind")
+        self.assertEqual(story.slug, "only-one-of-its-kind")
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse(
+                'printable_story_by_slug', kwargs={'title': story.slug}
+            ))
+        self.assertRedirects(response, reverse('printable_story', kwargs={
+            'pk': story.pk, 'title': story.slug
+        }), fetch_redirect_response=False)
+
+        Story.objects.create(title="Only one of its kind!")
+        response = self.client.get(reverse(
+            'printable_story_by_slug', kwargs={'title': story.slug}
+        ))
+        self.assertRedirects(response, reverse('index'))
+
     def test_requires_shareable_story_or_writer_logged_in(self):
         user = create_random_user()
         story = Story.objects.create(title="A fairytale")
@@ -61,6 +146,7 @@ class PrintableStoryViewTest(TestCase):
             "you might need to login or tell your friend to set their story as"
         )
         self.assertNotIn(story.title, str(response.content))
+        self.assertFalse(PrintableSnapshot.objects.exists())
 
         self.client.login(username=user.username, password="password")
         response = self.client.get(reverse(
@@ -116,6 +202,58 @@ class PrintableStoryViewTest(TestCase):
             "A public story will be displayed in our list for everyone to read"
         )
 
+    def test_no_marker_for_pages_without_the_story(self):
+        story = Story.objects.create(title="A private tale")
+        guessed_etag = '"{}-{}-reader"'.format(story.id, story.version)
+        for title in (story.slug, "wrong-title"):
+            response = self.client.get(reverse('printable_story', kwargs={
+                "pk": story.pk, "title": title
+            }), HTTP_IF_NONE_MATCH=guessed_etag)
+            self.assertNotEqual(response.status_code, 304)
+            self.assertNotIn('ETag', response)
+
+        Story.objects.filter(pk=story.pk).update(shareable=True)
+        response = self.client.get(reverse('printable_story', kwargs={
+            "pk": story.pk, "title": "wrong-title"
+        }), HTTP_IF_NONE_MATCH=guessed_etag)
+        self.assertRedirects(
+            response, reverse('index'), fetch_redirect_response=False
+        )
+        self.assertNotIn('ETag', response)
+
+    def test_conditional_get(self):
+        user = create_random_user()
+        story = Story.objects.create(title="A shared tale", shareable=True)
+        StoryWriter.objects.create(story=story, writer=user)
+        url = reverse('printable_story', kwargs={
+            "pk": story.pk, "title": slugify(story.title)
+        })
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        Snippet.objects.create(story=story, author=user, text="A new part")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "A new part")
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Last-Modified can't tell apart edits within the same second.
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.client.login(username=user.username, password="password")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Set as shareable")
+
     def test_with_wrong_title_redirects_to_index(self):
         user = create_random_user()
         story = Story.objects.create(title="The super cat!")
@@ -210,7 +348,97 @@ class PrintableStoryViewTest(TestCase):
         )
 
 
-class PublicStoriesViewTest(TestCase):
+class PrintableStoryExportViewTest(TestCase):
+
+    def create_story(self, **kwargs):
+        user = create_random_user()
+        story = Story.objects.create(title="A long tale", **kwargs)
+        StoryWriter.objects.create(story=story, writer=user)
+        for text in ("Once upon a time", "# <b>not</b> a *header*"):
+            Snippet.objects.create(story=story, author=user, text=text)
+        return user, story
+
+    def export(self, story, export_format):
+        return self.client.get(reverse('printable_story_export', kwargs={
+            'pk': story.pk,
+            'title': slugify(story.title),
+            'format': export_format
+        }))
+
+    def test_requires_shareable_story_or_writer_logged_in(self):
+        user, story = self.create_story()
+        printable_url = reverse('printable_story', kwargs={
+            'pk': story.pk, 'title': slugify(story.title)
+        })
+        self.assertRedirects(
+            self.export(story, 'txt'), printable_url,
+            fetch_redirect_response=False
+        )
+
+        self.client.login(username=user.username, password="password")
+        self.assertEqual(self.export(story, 'txt').status_code, 200)
+
+    def test_wrong_title_or_format_redirects_to_index(self):
+        user, story = self.create_story(shareable=True)
+        response = self.client.get(reverse('printable_story_export', kwargs={
+            'pk': story.pk, 'title': "another-title", 'format': 'txt'
+        }))
+        self.assertRedirects(response, reverse('index'))
+        self.assertRedirects(self.export(story, 'pdf'), reverse('index'))
+
+    def test_plain_text_download(self):
+        user, story = self.create_story(shareable=True)
+        response = self.export(story, 'txt')
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="a-long-tale.txt"'
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content).decode(),
+            "A Long Tale\n\nOnce upon a time\n\n" + (
+                "# <b>not</b> a *header*\n\n"
+            )
+        )
+
+    def test_markdown_download_escapes_text(self):
+        user, story = self.create_story(shareable=True)
+        content = b"".join(self.export(story, 'md').streaming_content)
+        self.assertEqual(content.decode(), "# A Long Tale\n\n" + (
+            "Once upon a time\n\n"
+        ) + "\\# \\<b\\>not\\</b\\> a \\*header\\*\n\n")
+
+    def test_html_streams_head_first(self):
+        user, story = self.create_story(shareable=True)
+        response = self.export(story, 'html')
+        self.assertNotIn('Content-Disposition', response)
+        chunks = [chunk.decode() for chunk in response.streaming_content]
+        self.assertIn("<title>A Long Tale</title>", chunks[0])
+        self.assertNotIn("Once upon a time", chunks[0])
+        content = "".join(chunks)
+        self.assertIn('<p class="links">Once upon a time</p>', content)
+        self.assertIn("&lt;b&gt;not&lt;/b&gt;", content)
+
+    def test_printable_story_links_to_downloads(self):
+        user, story = self.create_story(shareable=True)
+        response = self.client.get(reverse('printable_story', kwargs={
+            'pk': story.pk, 'title': slugify(story.title)
+        }))
+        for export_format in ('txt', 'md', 'html'):
+            self.assertContains(response, reverse(
+                'printable_story_export', kwargs={
+                    'pk': story.pk,
+                    'title': slugify(story.title),
+                    'format': export_format
+                }
+            ))
+
+
+class PublicStoriesViewTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
 
     def create_three_stories_with_different_users(self):
         story = Story.objects.create(title="Wonderful Story", public=True)
@@ -259,6 +487,23 @@ class PublicStoriesViewTest(TestCase):
             public_story_response, story.writers.get_queryset()[0].username
         )
 
+    @skipUnless(connection.vendor == 'sqlite', "Reads SQLite query plans.")
+    def test_pages_range_over_public_title_index(self):
+        self.create_three_stories_with_different_users()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('stories'), {
+                'after_title': "Awesome Story", 'after_id': 0
+            })
+        sql = next(
+            query['sql'] for query in queries
+            if 'ORDER BY "storysharing_story"."title"' in query['sql']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn("storysharin_public_2d3ab8_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
     def test_public_stories_ordered_by_title(self):
         # Titles for stories start with 'W' [0], 'A'[1], 'M'[2]
         stories, users = self.create_three_stories_with_different_users()
@@ -273,6 +518,181 @@ class PublicStoriesViewTest(TestCase):
 
         self.assertTrue(a_story_ind < m_story_ind < w_story_ind)
 
+    def test_public_stories_show_snippet_count(self):
+        stories, users = self.create_three_stories_with_different_users()
+        Snippet.objects.create(story=stories[0], author=users[0], text="Hi")
+        response = self.client.get(reverse('stories'))
+        self.assertContains(response, "(1 snippet, last active")
+        self.assertContains(response, "(0 snippets)", count=2)
+
+    def create_many_stories(self, no_stories, writer):
+        for number in range(no_stories):
+            story = Story.objects.create(
+                title="Tale {:02}".format(number // 2), public=True
+            )
+            StoryWriter.objects.create(story=story, writer=writer)
+        Story.objects.create(title="Tale 00 in private")
+        return list(Story.objects.filter(public=True).order_by('title', 'pk'))
+
+    def walk_pages(self, url, direction='next_page'):
+        titles = []
+        pages = 0
+        while url is not None:
+            # Pages are cached; walk them as they are built.
+            caches['shared'].clear()
+            response = self.client.get(url)
+            page = list(response.context['object_list'])
+            titles = (
+                titles + page if direction == 'next_page' else page + titles
+            )
+            pages += 1
+            url = response.context[direction]
+            if url is not None:
+                url = reverse('stories') + url
+        return titles, pages
+
+    def test_public_stories_paginated_by_title_and_id(self):
+        user = create_random_user()
+        stories = self.create_many_stories(7, user)
+        with patch.object(views, 'PUBLIC_STORIES_PER_PAGE', 3):
+            response = self.client.get(reverse('stories'))
+            self.assertEqual(
+                list(response.context['object_list']), stories[:3]
+            )
+            self.assertIsNone(response.context['previous_page'])
+            self.assertContains(response, "More stories")
+
+            pages, no_pages = self.walk_pages(reverse('stories'))
+            self.assertEqual(pages, stories)
+            self.assertEqual(no_pages, 3)
+
+            last_page = reverse('stories') + "?after_title={}".format(
+                stories[3].title
+            ) + "&after_id={}".format(stories[3].pk)
+            pages, no_pages = self.walk_pages(last_page, 'previous_page')
+            self.assertEqual(pages, stories)
+
+    def test_public_stories_page_size_limits(self):
+        user = create_random_user()
+        stories = self.create_many_stories(5, user)
+        response = self.client.get(reverse('stories') + "?per_page=2")
+        self.assertEqual(list(response.context['object_list']), stories[:2])
+        self.assertIn("per_page=2", response.context['next_page'])
+
+        for per_page in ("0", "-3", "many"):
+            response = self.client.get(
+                reverse('stories') + "?per_page=" + per_page
+            )
+            self.assertContains(
+                response, 'class="listlinks"',
+                count=1 if per_page != "many" else 5
+            )
+        with patch.object(views, 'PUBLIC_STORIES_MAX_PER_PAGE', 4):
+            response = self.client.get(reverse('stories') + "?per_page=50")
+            self.assertEqual(len(response.context['object_list']), 4)
+
+    def test_public_stories_queries_do_not_grow_with_page(self):
+        user = create_random_user()
+        self.create_many_stories(6, user)
+        for per_page in (1, 6):
+            with self.assertNumQueries(2):
+                self.client.get(
+                    reverse('stories') + "?per_page={}".format(per_page)
+                )
+
+    def test_unknown_writer_shows_empty_page(self):
+        self.create_three_stories_with_different_users()
+        response = self.client.get(reverse('stories') + "?writer=nobody")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['object_list']), [])
+        self.assertContains(response, "Public Stories by nobody")
+
+    def test_writer_public_stories_cached_until_they_change(self):
+        stories, users = self.create_three_stories_with_different_users()
+        url = reverse('stories') + "?writer=" + users[0].username
+        # The writer's stories are a subquery of the page query.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(list(response.context['object_list']), [stories[0]])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        stories[0].public = False
+        stories[0].save()
+        response = self.client.get(url)
+        self.assertEqual(list(response.context['object_list']), [])
+
+        StoryWriter.objects.create(story=stories[1], writer=users[0])
+        response = self.client.get(url)
+        self.assertEqual(list(response.context['object_list']), [stories[1]])
+
+        StoryWriter.objects.filter(writer=users[0]).delete()
+        response = self.client.get(url)
+        self.assertEqual(list(response.context['object_list']), [])
+
+    def test_listing_cached_until_public_catalog_changes(self):
+        stories, users = self.create_three_stories_with_different_users()
+        self.client.get(reverse('stories'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('stories'))
+        self.assertContains(response, "(0 snippets)", count=3)
+
+        Story.objects.create(title="Private tale")
+        with self.assertNumQueries(0):
+            self.client.get(reverse('stories'))
+
+        Snippet.objects.create(story=stories[0], author=users[0], text="Hi")
+        response = self.client.get(reverse('stories'))
+        self.assertContains(response, "(1 snippet, last active")
+
+        stories[1].public = False
+        stories[1].save()
+        response = self.client.get(reverse('stories'))
+        self.assertNotContains(response, stories[1].title)
+
+        Story.objects.create(title="New tale", public=True)
+        response = self.client.get(reverse('stories'))
+        self.assertContains(response, "New tale")
+
+    def test_outdated_listing_served_while_another_request_rebuilds(self):
+        stories, users = self.create_three_stories_with_different_users()
+        with patch.object(
+            views, 'get_versioned_fragment', wraps=get_versioned_fragment
+        ) as fragment:
+            self.client.get(reverse('stories'))
+        key = fragment.call_args[0][0]
+
+        stories[0].public = False
+        stories[0].save()
+        caches['shared'].add(key + ':rebuild', True)
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('stories'))
+        self.assertContains(response, stories[0].title)
+
+        caches['shared'].delete(key + ':rebuild')
+        response = self.client.get(reverse('stories'))
+        self.assertNotContains(response, stories[0].title)
+
+        Story.bump_catalog_version()
+        with patch.object(views, 'PUBLIC_STORIES_CACHE_TIMEOUT', -1):
+            self.client.get(reverse('stories'))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('stories'))
+
+    def test_writer_filter_is_paginated(self):
+        user = create_random_user()
+        stories = self.create_many_stories(4, user)
+        other_story = Story.objects.create(title="Another tale", public=True)
+        StoryWriter.objects.create(
+            story=other_story,
+            writer=User.objects.create(username="other", email="o@email.com")
+        )
+        pages, no_pages = self.walk_pages(
+            reverse('stories') + "?writer={}&per_page=3".format(user.username)
+        )
+        self.assertEqual(pages, stories)
+        self.assertEqual(no_pages, 2)
+
     def test_filtering_public_stories_by_writer(self):
         stories, users = self.create_three_stories_with_different_users()
         response = self.client.get(reverse('stories'))
@@ -301,6 +721,39 @@ class PublicStoriesViewTest(TestCase):
         self.assertNotIn(stories[0].title.title(), str(response.content))
 
 
+class PublicStoriesSharedCacheTest(TransactionTestCase):
+
+    def setUp(self):
+        caches['shared'].clear()
+        # What another process sees: its own backend on the shared cache.
+        config = settings.CACHES['shared']
+        self.other_cache = import_string(config['BACKEND'])(
+            config['LOCATION'], config
+        )
+
+    def test_catalog_version_bumped_once_committed(self):
+        version = Story.get_catalog_version()
+        with transaction.atomic():
+            Story.objects.create(title="A public tale", public=True)
+            self.assertEqual(Story.get_catalog_version(), version)
+        self.assertEqual(Story.get_catalog_version(), version + 1)
+
+    def test_catalog_version_bumped_by_another_process(self):
+        story = Story.objects.create(title="Old title", public=True)
+        self.client.get(reverse('stories'))
+        Story.objects.filter(pk=story.pk).update(title="New title")
+        self.assertContains(self.client.get(reverse('stories')), "Old title")
+
+        self.other_cache.incr(Story.catalog_version_key)
+        self.assertContains(self.client.get(reverse('stories')), "New title")
+
+        version = self.other_cache.get(Story.catalog_version_key)
+        Story.bump_catalog_version()
+        self.assertEqual(
+            self.other_cache.get(Story.catalog_version_key), version + 1
+        )
+
+
 class PersonalStoriesViewTest(TestCase):
 
     def create_two_stories_first_active(self):
@@ -360,6 +813,83 @@ class PersonalStoriesViewTest(TestCase):
 
         self.assertTrue(third_story_ind < other_story_ind < story_ind)
 
+    def create_stories_with_other_writers(self, user, no_stories):
+        others = [
+            User.objects.get_or_create(
+                username="writer{}".format(number),
+                email="writer{}@email.com".format(number)
+            )[0]
+            for number in range(3)
+        ]
+        for number in range(no_stories):
+            story = Story.objects.create(title="Tale {}".format(number))
+            StoryWriter.objects.create(story=story, writer=user)
+            for other in others:
+                StoryWriter.objects.create(story=story, writer=other)
+        return list(StoryWriter.objects.filter(writer=user).order_by('-pk'))
+
+    def test_personal_stories_queries_do_not_grow(self):
+        user = create_random_user()
+        self.client.login(username=user.username, password='password')
+        for no_stories in (2, 10):
+            storywriters = self.create_stories_with_other_writers(
+                user, no_stories
+            )
+            with self.assertNumQueries(4):
+                response = self.client.get(reverse('personal'))
+            self.assertContains(response, "writer2")
+            with self.assertNumQueries(4):
+                self.client.get(reverse('personal') + "?after={}".format(
+                    storywriters[0].pk
+                ))
+
+            story = storywriters[0].story
+            for storywriter in story.storywriter_set.all():
+                storywriter.set_active(True)
+            # The change itself, then the same 2 queries for the page.
+            with self.assertNumQueries(15):
+                response = self.client.post(
+                    reverse('personal'),
+                    data={'story': story.id, 'active': False}
+                )
+            self.assertContains(response, story.title)
+
+    def test_personal_stories_paginated_latest_first(self):
+        user = create_random_user()
+        self.client.login(username=user.username, password='password')
+        storywriters = self.create_stories_with_other_writers(user, 5)
+
+        with patch.object(views, 'PERSONAL_STORIES_PER_PAGE', 2):
+            pages = []
+            url = reverse('personal')
+            while url is not None:
+                response = self.client.get(url)
+                pages.append(list(response.context['object_list']))
+                url = response.context['next_page']
+                if url is not None:
+                    url = reverse('personal') + url
+            self.assertEqual(pages, [
+                storywriters[:2], storywriters[2:4], storywriters[4:]
+            ])
+            self.assertIsNone(response.context['next_page'])
+
+            response = self.client.get(
+                reverse('personal') + response.context['previous_page']
+            )
+            self.assertEqual(
+                list(response.context['object_list']), storywriters[2:4]
+            )
+            self.assertContains(response, "Newer stories")
+
+            response = self.client.post(
+                reverse('personal') + "?after={}".format(storywriters[1].pk),
+                data={'story': storywriters[2].story_id, 'active': True}
+            )
+            self.assertEqual(
+                list(response.context['object_list']), storywriters[2:4]
+            )
+            self.assertTrue(response.context['object_list'][0].active)
+
     def display_as_many_StoryWriterActiveForms_as_stories(self):
         self.create_two_stories_first_active()
         response = self.client.get(reverse('personal'), secure=True)
@@ -374,6 +904,18 @@ class PersonalStoriesViewTest(TestCase):
 
         self.assertIn("checked/>", content_chunks[0])
 
+    def test_post_story_user_does_not_write(self):
+        self.create_two_stories_first_active()
+        other_story = Story.objects.create(title="Someone else's story")
+        response = self.client.post(
+            reverse('personal'), secure=True,
+            data={'story': other_story.id, 'active': True}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(StoryWriter.objects.filter(
+            story=other_story).count(), 0
+        )
+
     def test_post_valid_form_change_active(self):
         user, story_one, story_two = self.create_two_stories_first_active()
         storywriter = StoryWriter.objects.filter(
@@ -443,6 +985,99 @@ class PersonalStoriesViewTest(TestCase):
         )
 
 
+class PersonalStoriesBulkViewTest(TestCase):
+
+    def setUp(self):
+        self.user = create_random_user()
+        self.client.login(username=self.user.username, password='password')
+        self.other_user = User.objects.create(
+            username="otheruser", email="other@email.com"
+        )
+
+    def create_stories(self, no_stories, active=False, others_active=False):
+        stories = []
+        for number in range(no_stories):
+            story = Story.objects.create(title="Tale {}".format(number))
+            StoryWriter.objects.create(
+                story=story, writer=self.user, active=active
+            )
+            StoryWriter.objects.create(
+                story=story, writer=self.other_user, active=others_active
+            )
+            stories.append(story)
+        return stories
+
+    def post(self, stories, active_stories, query=""):
+        return self.client.post(reverse('personal_bulk') + query, data={
+            'story': [story.pk for story in stories],
+            'active': [story.pk for story in active_stories]
+        })
+
+    def get_active_stories(self):
+        return set(StoryWriter.objects.filter(
+            writer=self.user, active=True
+        ).values_list('story_id', flat=True))
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.post(reverse('personal_bulk'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('login'), response['Location'])
+
+    @patch.object(
+        views.EmailActiveWritersMixin, 'send_email_to_active_writers'
+    )
+    def test_sets_active_stories_and_notifies_once_per_story(
+        self, mock_send_email_to_active_writers
+    ):
+        joining, staying = self.create_stories(2, others_active=True)
+        leaving = self.create_stories(1, active=True, others_active=True)[0]
+        storywriter = StoryWriter.objects.get(story=leaving, writer=self.user)
+        storywriter.set_active(False)
+        storywriter.set_active(True)
+        self.assertTrue(Story.objects.get(pk=leaving.pk).available)
+        someone_elses = Story.objects.create(title="Not mine")
+
+        response = self.post(
+            [joining, staying, leaving, someone_elses],
+            [joining, someone_elses],
+            query="?after=10"
+        )
+        self.assertRedirects(
+            response, reverse('personal') + "?after=10",
+            fetch_redirect_response=False
+        )
+        self.assertEqual(self.get_active_stories(), {joining.pk})
+        self.assertFalse(StoryWriter.objects.filter(
+            story=someone_elses
+        ).exists())
+
+        self.assertTrue(Story.objects.get(pk=joining.pk).available)
+        self.assertFalse(Story.objects.get(pk=staying.pk).available)
+        self.assertFalse(Story.objects.get(pk=leaving.pk).available)
+        mock_send_email_to_active_writers.assert_called_once_with(
+            story=joining, update="The story is now available to play."
+        )
+
+        self.post([joining, staying, leaving], [joining])
+        self.assertEqual(
+            Story.objects.get(pk=joining.pk).active_writer_count, 2
+        )
+
+    def test_queries_do_not_grow_with_stories(self):
+        for no_stories in (2, 8):
+            StoryWriter.objects.filter(writer=self.user).delete()
+            stories = self.create_stories(no_stories)
+            # Session, user, form validation, the rows, one UPDATE of them
+            # and of their stories, the availability checks and savepoints.
+            with self.assertNumQueries(13):
+                self.post(stories, stories[:no_stories // 2])
+            self.assertEqual(
+                self.get_active_stories(),
+                {story.pk for story in stories[:no_stories // 2]}
+            )
+
+
 class DisplayStoryViewTest(TestCase):
 
     inactive_user_text = "If you want to play here, visit".format(
@@ -451,6 +1086,9 @@ class DisplayStoryViewTest(TestCase):
         )
     )
 
+    def setUp(self):
+        cache.clear()
+
     def test_displays_public_story(self):
         user = create_random_user()
         story = Story.objects.create(title="Awesome Rodent", public=True)
@@ -490,6 +1128,54 @@ class DisplayStoryViewTest(TestCase):
         self.assertContains(response, printable_link)
         self.assertContains(response, "See printable version & story settings")
 
+    def test_no_marker_for_stories_the_user_may_not_see(self):
+        user = create_random_user()
+        story = Story.objects.create(title="A private tale")
+        StoryWriter.objects.create(story=story, writer=user, active=True)
+        url = reverse('display_story', kwargs={'id': story.id})
+        guessed_etag = '"{}-{}-reader"'.format(story.id, story.version)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=guessed_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "This story doesn't exist!")
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+        self.client.login(username=user.username, password="password")
+        self.assertIn('ETag', self.client.get(url))
+
+    def test_conditional_get_varies_by_role(self):
+        user = create_random_user()
+        other_user = User.objects.create(
+            username="otheruser", email="other@email.com"
+        )
+        other_user.set_password('password')
+        other_user.save()
+        story = Story.objects.create(title="A public tale", public=True)
+        StoryWriter.objects.create(story=story, writer=user, active=True)
+        url = reverse('display_story', kwargs={'id': story.id})
+
+        reader_etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=reader_etag).status_code,
+            304
+        )
+
+        self.client.login(username=user.username, password='password')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=reader_etag)
+        self.assertEqual(response.status_code, 200)
+        writer_etag = response['ETag']
+        self.assertNotEqual(writer_etag, reader_etag)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=writer_etag).status_code,
+            304
+        )
+
+        self.client.login(username=other_user.username, password='password')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=writer_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(writer_etag, (reader_etag, response['ETag']))
+
     def test_displays_public_empty_story(self):
         story = Story.objects.create(title="Awesome Rodent", public=True)
         response = self.client.get(
@@ -670,6 +1356,31 @@ class DisplayStoryViewTest(TestCase):
             "<i class=\"fas fa-pen\"></i>"
         )
 
+    def test_edited_snippet_fragment_rendered_again(self):
+        user = create_random_user()
+        story = Story.objects.create(
+            title="The cat and the mouse", public=True
+        )
+        snippet = Snippet.objects.create(
+            story=story, author=user, text="The cat chased the mouse."
+        )
+        url = reverse('display_story', kwargs={'id': story.id})
+        response = self.client.get(url)
+        self.assertContains(response, snippet.text)
+
+        self.client.login(username=user.username, password="password")
+        self.client.post(reverse('snippet_edit', kwargs={
+            'pk': snippet.pk
+        }), data={'text': "The mouse chased the cat."})
+        response = self.client.get(url)
+        self.assertNotIn(snippet.text, str(response.content))
+        self.assertIn(
+            "The mouse chased the cat.\\n \\n {}".format(
+                "<i class=\"fas fa-feather-alt\">"
+            ),
+            " ".join(str(response.content).split())
+        )
+
     def test_edited_icon_on_edited_snippets(self):
         user = create_random_user()
         story = Story.objects.create(
@@ -700,6 +1411,72 @@ class DisplayStoryViewTest(TestCase):
             " ".join(str(response.content).split())
         )
 
+    @patch.object(views, 'SNIPPETS_PER_PAGE', 2)
+    def test_snippets_paginated_from_latest(self):
+        user = create_random_user()
+        other_user = User.objects.create(
+            username="otheruser", email="other@email.com"
+        )
+        story = Story.objects.create(
+            title="A very long story", public=True, available=True
+        )
+        StoryWriter.objects.create(story=story, writer=user, active=True)
+        snippets = [
+            Snippet.objects.create(
+                story=story, author=[other_user, user][number % 2],
+                text="Snippet number {}".format(number)
+            ) for number in range(5)
+        ]
+        url = reverse('display_story', kwargs={'id': story.id})
+
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.context['snippets'], snippets[3:])
+        self.assertNotIn(snippets[2].text, str(response.content))
+        self.assertContains(
+            response,
+            "<a href=\"?before={}\">Load earlier snippets</a>".format(
+                snippets[3].pk
+            )
+        )
+        self.assertNotIn("Go to the latest snippets", str(response.content))
+
+        response = self.client.get(
+            url + "?before={}".format(snippets[3].pk), secure=True
+        )
+        self.assertEqual(response.context['snippets'], snippets[1:3])
+        self.assertContains(
+            response, "?before={}".format(snippets[1].pk)
+        )
+        self.assertContains(response, "Go to the latest snippets")
+
+        response = self.client.get(
+            url + "?before={}".format(snippets[1].pk), secure=True
+        )
+        self.assertEqual(response.context['snippets'], snippets[:1])
+        self.assertNotIn("Load earlier snippets", str(response.content))
+
+    @patch.object(views, 'SNIPPETS_PER_PAGE', 2)
+    def test_turn_check_uses_last_snippet_on_earlier_pages(self):
+        user = create_random_user()
+        other_user = User.objects.create(
+            username="otheruser", email="other@email.com"
+        )
+        story = Story.objects.create(title="A long story", available=True)
+        StoryWriter.objects.create(story=story, writer=user, active=True)
+        for number in range(5):
+            Snippet.objects.create(
+                story=story, author=[user, other_user][number % 2],
+                text="Snippet number {}".format(number)
+            )
+        first_snippet = Snippet.objects.filter(story=story).order_by('pk')[0]
+        self.client.login(username=user.username, password='password')
+
+        response = self.client.get(reverse(
+            'display_story', kwargs={'id': story.id}
+        ) + "?before={}".format(first_snippet.pk + 2), secure=True)
+        self.assertEqual(response.context['form'], False)
+        self.assertNotIn("Add New Snippet", str(response.content))
+
     @patch.object(
         views.EmailActiveWritersMixin, 'send_email_to_active_writers'
     )
@@ -737,6 +1514,73 @@ class DisplayStoryViewTest(TestCase):
             update="A new Snippet has been added to the story."
         )
 
+    @patch.object(
+        views.EmailActiveWritersMixin, 'send_email_to_active_writers'
+    )
+    def test_post_checks_turn(self, mock_send_email_to_active_writers):
+        user = create_random_user()
+        other_user = User.objects.create(
+            username="otheruser", email="other@email.com"
+        )
+        story = Story.objects.create(title="A scary story", available=True)
+        storywriter = StoryWriter.objects.create(
+            story=story, writer=user, active=True
+        )
+        other_story = Story.objects.create(title="Not mine", available=True)
+        StoryWriter.objects.create(
+            story=other_story, writer=other_user, active=True
+        )
+        self.client.login(username=user.username, password='password')
+
+        def post(story, text):
+            return self.client.post(
+                reverse('display_story', kwargs={'id': story.id}),
+                data={'text': text, 'story': story.id, 'author': user.id}
+            )
+
+        def assert_rejected(response, reason, text):
+            self.assertContains(response, reason)
+            self.assertContains(response, "has not been added yet")
+            self.assertContains(response, text)
+            self.assertContains(response, 'value="Add Snippet"')
+
+        response = post(story, "The first snippet.")
+        self.assertContains(response, "Wait for one of the other")
+        self.assertNotContains(response, "The first snippet.</textarea>")
+        response = post(story, "A second snippet in a row.")
+        assert_rejected(
+            response, "You added the last snippet.",
+            "A second snippet in a row."
+        )
+        self.assertEqual(Snippet.objects.filter(story=story).count(), 1)
+        self.assertEqual(mock_send_email_to_active_writers.call_count, 1)
+
+        Snippet.objects.create(story=story, author=other_user, text="Hi")
+        storywriter.active = False
+        storywriter.save()
+        response = post(story, "Not my turn while inactive.")
+        assert_rejected(
+            response, "You are not active in this story.",
+            "Not my turn while inactive."
+        )
+        storywriter.active = True
+        storywriter.save()
+        Story.objects.filter(pk=story.pk).update(available=False)
+        response = post(story, "Nor while the story is unavailable.")
+        assert_rejected(
+            response, "This story is not available to play right now",
+            "Nor while the story is unavailable."
+        )
+        self.assertEqual(Snippet.objects.filter(story=story).count(), 2)
+
+        response = post(other_story, "Not even my story.")
+        self.assertContains(response, "This story doesn't exist!")
+        self.assertFalse(Snippet.objects.filter(story=other_story).exists())
+
+        Story.objects.filter(pk=story.pk).update(available=True)
+        post(story, "My turn again.")
+        self.assertEqual(Snippet.objects.filter(story=story).count(), 3)
+
     @patch.object(
         views.EmailActiveWritersMixin, 'send_email_to_active_writers'
     )
@@ -816,6 +1660,57 @@ class StartStoryViewTest(TestCase):
             reverse('display_story', kwargs={'id': story.id})
         )
 
+    def test_post_correct_form_queues_emails_to_writers(self):
+        user = create_random_user()
+        self.client.login(username=user.username, password="password")
+        another_user = User.objects.create(
+            username="otheruser",
+            email='other@email.com'
+        )
+        post_data = {
+            'title': "A story title",
+            'writers': [another_user.id],
+            'public': True
+        }
+        self.client.post(reverse('start_story'), secure=True, data=post_data)
+        queued = OutgoingEmail.objects.order_by('to_email')
+        self.assertEqual(
+            [x.to_email for x in queued],
+            [another_user.email, user.email]
+        )
+        for email in queued:
+            self.assertEqual(email.subject, "Black Cat Story Sharing - News")
+            self.assertEqual(email.from_email, EMAIL_HOST_USER)
+            self.assertIsNone(email.sent)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_post_queries_do_not_grow_with_writers(self):
+        user = create_random_user()
+        self.client.login(username=user.username, password="password")
+        writers = [
+            User.objects.create(
+                username="writer{}".format(number),
+                email="writer{}@email.com".format(number)
+            )
+            for number in range(50)
+        ]
+        for no_writers in (1, 50):
+            post_data = {
+                'title': "A story with {} writers".format(no_writers),
+                'writers': [
+                    writer.id for writer in writers[:no_writers]
+                ] + [user.id],
+                'public': True
+            }
+            queued = OutgoingEmail.objects.count()
+            with self.assertNumQueries(9):
+                self.client.post(reverse('start_story'), data=post_data)
+            story = Story.objects.get(title=post_data['title'])
+            self.assertEqual(story.writers.count(), no_writers + 1)
+            self.assertEqual(
+                OutgoingEmail.objects.count(), queued + no_writers + 1
+            )
+
     def test_post_incorrect_form(self):
         user = create_random_user()
         self.client.login(username=user.username, password="password")
@@ -860,8 +1755,34 @@ class StartStoryViewTest(TestCase):
         )
 
 
+class StartStoryListingTest(TransactionTestCase):
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_post_public_story_shown_in_writer_listing(self):
+        user = create_random_user()
+        self.client.login(username=user.username, password="password")
+        url = reverse('stories') + "?writer=" + user.username
+        self.assertNotContains(self.client.get(url), "A public story")
+        other_user = User.objects.create(
+            username="otheruser", email="other@email.com"
+        )
+        self.client.post(reverse('start_story'), data={
+            'title': "A public story", 'writers': [other_user.id],
+            'public': True
+        })
+        self.assertContains(self.client.get(url), "A public story")
+        self.assertContains(
+            self.client.get(reverse('search') + "?q=public"), "A public story"
+        )
+
+
 class SnippetEditViewTest(TestCase):
 
+    def setUp(self):
+        cache.clear()
+
     def create_user_story_snippet(self):
         user = create_random_user()
         story = Story.objects.create(title="The friendly spider")
@@ -946,10 +1867,197 @@ class SnippetEditViewTest(TestCase):
         self.assertEqual(refetched_snippet.edited, False)
 
 
+class SnippetListingQueriesTest(TestCase):
+    """
+    Rendering a story takes the same number of queries whatever the number
+    of snippets on the page, both with an empty fragment cache and with a
+    warm one.
+    """
+
+    snippet_counts = (1, 10, 60)
+
+    def create_story(self, no_snippets):
+        Story.objects.all().delete()
+        User.objects.all().delete()
+        cache.clear()
+        user = create_random_user()
+        other_user = User.objects.create(
+            username="otheruser", email="other@email.com"
+        )
+        story = Story.objects.create(
+            title="Long story", available=True, shareable=True
+        )
+        StoryWriter.objects.create(story=story, writer=user, active=True)
+        StoryWriter.objects.create(
+            story=story, writer=other_user, active=True
+        )
+        for number in range(no_snippets):
+            Snippet.objects.create(
+                story=story, author=[user, other_user][number % 2],
+                text="Snippet number {}".format(number)
+            )
+        self.client.login(username=user.username, password="password")
+        return user, story
+
+    def assert_queries_per_snippet_count(self, request, cold, warm=None):
+        for no_snippets in self.snippet_counts:
+            with self.subTest(snippets=no_snippets):
+                user, story = self.create_story(no_snippets)
+                for expected in (cold, cold if warm is None else warm):
+                    with self.assertNumQueries(expected):
+                        response = request(story)
+                    self.assertContains(
+                        response, "Snippet number {}".format(no_snippets - 1)
+                    )
+
+    def test_display_story(self):
+        self.assert_queries_per_snippet_count(lambda story: self.client.get(
+            reverse('display_story', kwargs={'id': story.id}), secure=True
+        ), 6)
+
+    def test_display_story_post(self):
+        self.assert_queries_per_snippet_count(lambda story: self.client.post(
+            reverse('display_story', kwargs={'id': story.id}),
+            data={'story': story.id, 'text': ""},
+            secure=True
+        ), 7)
+
+    def test_printable_story(self):
+        self.assert_queries_per_snippet_count(lambda story: self.client.get(
+            reverse('printable_story', kwargs={
+                'pk': story.pk, 'title': slugify(story.title)
+            }),
+            secure=True
+        ), 13, 6)
+
+
+class StorySyncViewTest(TestCase):
+
+    def create_story(self, no_snippets, **kwargs):
+        user = create_random_user()
+        story = Story.objects.create(title="Synced story", **kwargs)
+        StoryWriter.objects.create(story=story, writer=user, active=True)
+        for number in range(no_snippets):
+            Snippet.objects.create(
+                story=story, author=user,
+                text="Snippet number {}".format(number)
+            )
+        story.refresh_from_db()
+        return user, story
+
+    def sync(self, story, **params):
+        response = self.client.get(
+            reverse('story_sync', kwargs={'id': story.id}), params
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_private_story_only_for_writers(self):
+        user, story = self.create_story(1)
+        response = self.client.get(
+            reverse('story_sync', kwargs={'id': story.id})
+        )
+        self.assertEqual(response.status_code, 404)
+
+        self.client.login(username=user.username, password="password")
+        data = self.sync(story)
+        self.assertEqual(data['snippets'][0]['text'], "Snippet number 0")
+        self.assertEqual(data['snippets'][0]['author'], user.username)
+
+    def test_unchanged_story_answers_not_modified(self):
+        user, story = self.create_story(1, public=True)
+        url = reverse('story_sync', kwargs={'id': story.id})
+        params = {'version': story.version}
+        response = self.client.get(url, params)
+        self.assertEqual(response.json()['snippets'], [])
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Snippet.objects.create(story=story, author=user, text="Late part")
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json()['version'], story.version)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_display_page_polls_from_its_version(self):
+        user, story = self.create_story(1, public=True)
+        response = self.client.get(
+            reverse('display_story', kwargs={'id': story.id})
+        )
+        self.assertContains(
+            response, "var storyVersion = {};".format(story.version)
+        )
+        self.assertContains(
+            response, reverse('story_sync', kwargs={'id': story.id})
+        )
+
+    def test_snippets_after_cursor(self):
+        user, story = self.create_story(3, public=True)
+        first, second, third = Snippet.objects.order_by('pk')
+        data = self.sync(story, after=first.pk)
+        self.assertEqual(
+            [snippet['id'] for snippet in data['snippets']],
+            [second.pk, third.pk]
+        )
+        self.assertEqual(data['after'], third.pk)
+        self.assertEqual(data['version'], story.version)
+        self.assertTrue(data['complete'])
+
+        data = self.sync(story, after=data['after'])
+        self.assertEqual(data['snippets'], [])
+        self.assertEqual(data['after'], third.pk)
+
+    def test_snippets_edited_since_version(self):
+        user, story = self.create_story(3, public=True)
+        first = Snippet.objects.order_by('pk').first()
+        last = Snippet.objects.order_by('pk').last()
+        first.text = "An edited beginning"
+        first.edited = True
+        first.save()
+        new = Snippet.objects.create(story=story, author=user, text="New")
+
+        data = self.sync(story, after=last.pk, version=story.version)
+        self.assertEqual([
+            (snippet['id'], snippet['text'], snippet['edited'])
+            for snippet in data['snippets']
+        ], [(first.pk, "An edited beginning", True), (new.pk, "New", False)])
+        story.refresh_from_db()
+        self.assertEqual(data['version'], story.version)
+
+        data = self.sync(story, after=data['after'], version=data['version'])
+        self.assertEqual(data['snippets'], [])
+
+    def test_large_sync_is_paginated(self):
+        user, story = self.create_story(5, public=True)
+        with patch.object(views, 'SNIPPETS_PER_PAGE', 2):
+            data = self.sync(story, version=0)
+            synced = [snippet['id'] for snippet in data['snippets']]
+            while not data['complete']:
+                data = self.sync(
+                    story, after=data['after'], version=data['version']
+                )
+                synced += [snippet['id'] for snippet in data['snippets']]
+        self.assertEqual(synced, list(
+            Snippet.objects.order_by('pk').values_list('pk', flat=True)
+        ))
+
+    def test_query_count_independent_of_story_length(self):
+        for no_snippets in (1, 20):
+            Story.objects.all().delete()
+            User.objects.all().delete()
+            user, story = self.create_story(no_snippets, public=True)
+            last = Snippet.objects.order_by('pk').last()
+            with self.assertNumQueries(2):
+                self.sync(story, after=last.pk, version=story.version)
+
+
 class EmailActiveWritersMixinTest(TestCase):
 
-    @patch.object(views, 'send_mail')
-    def test_email_sent_correctly(self, mock_send_mail):
+    @patch.object(views, 'queue_mail')
+    def test_email_sent_correctly(self, mock_queue_mail):
         user = create_random_user()
         other_user = User.objects.create(
             username="otheruser", email="other@email.com"
@@ -977,26 +2085,63 @@ class EmailActiveWritersMixinTest(TestCase):
             )
         ) + "Kindly, the {} team.".format(SITE_DOMAIN)
 
-        all_calls = mock_send_mail.mock_calls
-        user_call = call(
-            "Black Cat Story Sharing - Update",
-            body,
-            EMAIL_HOST_USER,
-            [user.email]
+        self.assertEqual(len(mock_queue_mail.mock_calls), 1)
+        args = mock_queue_mail.call_args[0]
+        self.assertEqual(
+            args[:3],
+            ("Black Cat Story Sharing - Update", body, EMAIL_HOST_USER)
+        )
+        self.assertEqual(sorted(args[3]), [other_user.email, user.email])
+
+    def test_query_count_independent_of_writers(self):
+        for no_writers in (2, 10, 30):
+            story = Story.objects.create(title="Awesome Story")
+            for number in range(no_writers):
+                writer = User.objects.create(
+                    username="writer{}-{}".format(no_writers, number),
+                    email="writer{}@email.com".format(number),
+                    digest_updates=number % 2 == 0
+                )
+                StoryWriter.objects.create(
+                    story=story, writer=writer, active=True
+                )
+
+            # Active writers, outbox insert and digest buffer insert.
+            with self.assertNumQueries(3):
+                views.EmailActiveWritersMixin().send_email_to_active_writers(
+                    story=story,
+                    update="Beautiful Update"
+                )
+
+    @patch.object(views, 'queue_mail')
+    def test_digest_writers_get_buffered_updates(self, mock_queue_mail):
+        user = create_random_user()
+        digest_user = User.objects.create(
+            username="digestuser", email="digest@email.com",
+            digest_updates=True
+        )
+        story = Story.objects.create(title="Awesome Story")
+        StoryWriter.objects.create(story=story, writer=user, active=True)
+        StoryWriter.objects.create(
+            story=story, writer=digest_user, active=True
         )
-        other_user_call = call(
-            "Black Cat Story Sharing - Update",
-            body,
-            EMAIL_HOST_USER,
-            [other_user.email]
+
+        views.EmailActiveWritersMixin().send_email_to_active_writers(
+            story=story,
+            update="Beautiful Update"
         )
-        self.assertIn(user_call, all_calls)
-        self.assertIn(other_user_call, all_calls)
-        self.assertEqual(len(all_calls), 2)
+        self.assertEqual(mock_queue_mail.call_args[0][3], [user.email])
+        update = StoryUpdate.objects.get()
+        self.assertEqual(update.writer, digest_user)
+        self.assertEqual(update.story, story)
+        self.assertEqual(update.text, "Beautiful Update")
 
 
 class BaseContentTest(TestCase):
 
+    def setUp(self):
+        cache.clear()
+
     def test_header_displays_in_all_pages(self):
         user = create_random_user()
         self.client.login(username=user.username, password="password")
@@ -1019,8 +2164,12 @@ class BaseContentTest(TestCase):
         pages + ['logout']
 
         pages.remove('display_story')
+        pages.remove('story_sync')
+        pages.remove('personal_bulk')
         pages.remove('reset_password')
         pages.remove('printable_story')
+        pages.remove('printable_story_by_slug')
+        pages.remove('printable_story_export')
         pages.remove('snippet_edit')
 
         pages.remove('jsi18n')
@@ -1077,8 +2226,12 @@ class BaseContentTest(TestCase):
         pages.remove('logout')
 
         pages.remove('display_story')
+        pages.remove('story_sync')
+        pages.remove('personal_bulk')
         pages.remove('reset_password')
         pages.remove('printable_story')
+        pages.remove('printable_story_by_slug')
+        pages.remove('printable_story_export')
         pages.remove('snippet_edit')
 
         pages.remove('jsi18n')
@@ -3,7 +3,7 @@ from django.urls import path
 from django.views.i18n import JavaScriptCatalog
 from django.views.generic import TemplateView, ListView
 from . import views
-from .. import user_views
+from .. import user_forms, user_views
 
 urlpatterns = [
     path(
@@ -16,11 +16,21 @@ urlpatterns = [
         views.PublicStoriesView.as_view(),
         name='stories'
     ),
+    path(
+        'search',
+        views.SearchView.as_view(),
+        name='search'
+    ),
     path(
         'personal',
         views.PersonalStoriesView.as_view(),
         name='personal'
     ),
+    path(
+        'personal_bulk',
+        views.PersonalStoriesBulkView.as_view(),
+        name='personal_bulk'
+    ),
     path(
         'start_story',
         views.StartStoryView.as_view(),
@@ -31,11 +41,26 @@ urlpatterns = [
         views.DisplayStoryView.as_view(),
         name='display_story'
     ),
+    path(
+        'story_sync/<int:id>/',
+        views.StorySyncView.as_view(),
+        name='story_sync'
+    ),
+    path(
+        'printable_story/<slug:title>',
+        views.PrintableStorySlugView.as_view(),
+        name='printable_story_by_slug'
+    ),
     path(
         'printable_story/<slug:pk>/<title>',
         views.PrintableStoryView.as_view(),
         name='printable_story'
     ),
+    path(
+        'printable_story/<slug:pk>/<title>/<format>',
+        views.PrintableStoryExportView.as_view(),
+        name='printable_story_export'
+    ),
     path(
         'snippet_edit/<slug:pk>/',
         views.SnippetEditView.as_view(),
@@ -88,7 +113,8 @@ urlpatterns = urlpatterns + [
         auth_views.PasswordResetView.as_view(
             template_name='user/lost_password.html',
             success_url='/lost_password_done',
-            email_template_name='user/email_reset_password.html'
+            email_template_name='user/email_reset_password.html',
+            form_class=user_forms.QueuedPasswordResetForm
         ),
         name='lost_password'
     ),
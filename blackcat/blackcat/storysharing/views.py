@@ -1,17 +1,46 @@
-from blackcat.settings import SITE_DOMAIN, EMAIL_HOST_USER
+import gzip
+import hashlib
+import re
+
+from blackcat.settings import (
+    SITE_DOMAIN, EMAIL_HOST_USER, SNIPPETS_PER_PAGE, PUBLIC_STORIES_PER_PAGE,
+    PUBLIC_STORIES_MAX_PER_PAGE, PUBLIC_STORIES_CACHE_TIMEOUT,
+    PUBLIC_STORIES_STALE_TIMEOUT, PUBLIC_STORIES_REBUILD_TIMEOUT,
+    PERSONAL_STORIES_PER_PAGE, STORY_SYNC_POLL_INTERVAL,
+    SEARCH_RESULTS_PER_PAGE, SEARCH_MAX_PAGES
+)
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
-from django.http import HttpResponseRedirect
+from django.db import transaction
+from django.db.models import (
+    BooleanField, Exists, OuterRef, Prefetch, Q, Value
+)
+from django.http import (
+    HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import render
 from django.template import loader
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
 from django.utils.decorators import method_decorator
-from django.utils.text import slugify
+from django.utils.http import http_date, urlencode
+from django.utils.safestring import mark_safe
 from django.views.generic import ListView, View, DetailView
-from .models import Story, StoryWriter, Snippet, User
+from .exports import EXPORT_CONTENT_TYPES, EXPORTERS
+from .fragments import (
+    FRAGMENT_FIELDS, get_printable_snapshot, get_versioned_fragment,
+    render_snippet_fragments
+)
+from .mail import queue_mail
+from .search import search_stories
+from .models import (
+    Story, StoryWriter, Snippet, StoryUpdate, User
+)
 from .forms import (
-    StartStoryForm, StoryWriterActiveForm, CreateSnippetForm,
-    StorySettingsForm, SnippetEditForm
+    StartStoryForm, StoryWriterActiveForm, StoryWriterBulkActiveForm,
+    CreateSnippetForm, StorySettingsForm, SnippetEditForm
 )
 
 
@@ -28,63 +57,206 @@ class EmailActiveWritersMixin(object):
             )
         ) + "Kindly, the {} team.".format(SITE_DOMAIN)
 
-        send_to = [
-            x.writer.email for x in StoryWriter.objects.filter(
-                story=story).filter(active=True)
-        ]
-        for email in send_to:
-            send_mail(
-                "Black Cat Story Sharing - Update",
-                body,
-                EMAIL_HOST_USER,
-                [email]
-            )
+        send_to = []
+        digest_updates = []
+        for writer_id, email, digest in story.get_active_writers():
+            if digest:
+                digest_updates.append(StoryUpdate(
+                    writer_id=writer_id, story=story, text=update
+                ))
+            else:
+                send_to.append(email)
+
+        StoryUpdate.objects.bulk_create(digest_updates)
+        queue_mail(
+            "Black Cat Story Sharing - Update",
+            body,
+            EMAIL_HOST_USER,
+            send_to
+        )
 
 
-class PrintableStoryView(DetailView, EmailActiveWritersMixin):
+class ConditionalStoryMixin(object):
+    """
+    Answer If-None-Match requests for a story page with a 304, looking only
+    at the story's version marker.
+
+    The ETag varies by role: anonymous readers share it, while a logged in
+    user's page shows their name (and their form, for writers), so their
+    ETag is their own. Last-Modified is only sent along: with its one
+    second resolution, two edits in the same second would look alike, so
+    If-Modified-Since is never answered with a 304.
+
+    Pages the user may not see get no marker at all, so neither the ETag
+    nor a 304 tells whether the story exists or how often it changed.
+    """
+    story_kwarg = 'pk'
+    vary_on = ('Cookie',)
+
+    def may_view(self, story, kwargs):
+        """
+        Whether the page of story, a dict of its marker fields, shows the
+        story itself: it is public or the user is one of its writers.
+        """
+        return story['public'] or story['is_writer']
+
+    def get_etag_variant(self, request, shareable):
+        """
+        Suffix of the ETag for pages that come in several encodings.
+        """
+        return ''
+
+    def get_story_marker(self, request, story_id, kwargs):
+        stories = Story.objects.filter(pk=story_id)
+        if request.user.is_authenticated:
+            stories = stories.annotate(is_writer=Exists(
+                StoryWriter.objects.filter(
+                    story=OuterRef('pk'), writer=request.user
+                )
+            ))
+        else:
+            stories = stories.annotate(is_writer=Value(
+                False, output_field=BooleanField()
+            ))
+        story = stories.values(
+            'version', 'last_modified', 'public', 'shareable', 'slug',
+            'is_writer'
+        ).first()
+        if story is None or not self.may_view(story, kwargs):
+            return None
+
+        if story['is_writer']:
+            # Writers get a form; its CSRF token must not outlive the cookie.
+            role = "writer-{}-{}".format(request.user.pk, hashlib.md5(
+                request.META.get('CSRF_COOKIE', '').encode()
+            ).hexdigest()[:8])
+        elif request.user.is_authenticated:
+            role = "reader-{}".format(request.user.pk)
+        else:
+            role = "reader"
+        etag = '"{}-{}-{}{}"'.format(
+            story_id, story['version'], role,
+            self.get_etag_variant(request, story['shareable'])
+        )
+        return etag, int(story['last_modified'].timestamp())
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        try:
+            marker = self.get_story_marker(
+                request, int(kwargs[self.story_kwarg]), kwargs
+            )
+        except ValueError:
+            marker = None
+        if marker is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag, last_modified = marker
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, self.vary_on)
+        return response
+
+
+class PrintableStoryView(
+    ConditionalStoryMixin, DetailView, EmailActiveWritersMixin
+):
     template_name = 'storysharing/printable_story.html'
     model = Story
     form_name = StorySettingsForm
+    accepts_gzip = re.compile(r'\bgzip\b')
+    vary_on = ('Cookie', 'Accept-Encoding')
+
+    def sends_gzip(self, request):
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        return bool(self.accepts_gzip.search(accept_encoding))
+
+    def may_view(self, story, kwargs):
+        # Anyone else gets the page without the story, or a redirect.
+        return (
+            (story['shareable'] or story['is_writer']) and
+            story['slug'] == kwargs['title']
+        )
+
+    def get_etag_variant(self, request, shareable):
+        # The gzipped snapshot page is a representation of its own.
+        if (shareable and not request.user.is_authenticated and
+                self.sends_gzip(request)):
+            return '-gzip'
+        return ''
+
+    def get_snapshot(self):
+        if not hasattr(self, 'snapshot'):
+            self.snapshot = get_printable_snapshot(self.object)
+        return self.snapshot
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['is_writer'] = self.object.has_writer(self.request.user)
+        # Only readers who may see the story need its snapshot built.
+        if self.object.shareable or context['is_writer']:
+            context['story_body'] = mark_safe(self.get_snapshot().body)
+        return context
+
+    def render_snapshot_page(self, request):
+        """
+        Answer anonymous readers of a shareable story straight from the
+        snapshot's gzipped page, decompressing it only for clients that
+        can't take gzip.
+        """
+        page = bytes(self.get_snapshot().page_gzip)
+        if self.sends_gzip(request):
+            response = HttpResponse(page)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(page))
+        return response
 
     def get(self, request, *args, **kwargs):
         self.object = self.get_object()
-        if slugify(self.object.title) != kwargs['title']:
+        if self.object.slug != kwargs['title']:
             return HttpResponseRedirect(reverse('index'))
+        if self.object.shareable and not request.user.is_authenticated:
+            return self.render_snapshot_page(request)
         context = self.get_context_data(object=self.object)
         context['form'] = self.form_name(
             initial={
                 "shareable": self.object.shareable,
                 "public": self.object.public
             })
-        context['is_writer'] = request.user.username in [
-            x['username'] for x in self.object.writers.values()]
         return self.render_to_response(context)
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
-        context = self.get_context_data(object=self.object)
-        context['is_writer'] = request.user in self.object.writers.all()
-
         if (
-            slugify(self.object.title) != kwargs['title']
+            self.object.slug != kwargs['title']
         ) or (
-            not context['is_writer']
+            not self.object.has_writer(request.user)
         ):
             return HttpResponseRedirect(reverse('index'))
+        context = self.get_context_data(object=self.object)
 
         form = self.form_name(request.POST)
         if form.is_valid():
-            self.object.shareable = form.cleaned_data['shareable']
-            self.object.public = form.cleaned_data['public']
-            self.object.save()
-
-            self.send_email_to_active_writers(
-                self.object,
-                "The story has been set as {}public and {}shareable ".format(
-                    "" if self.object.public else "not ",
-                    "" if self.object.shareable else "not "
-                ) + "by writer {}.".format(request.user.username)
-            )
+            with transaction.atomic():
+                self.object.shareable = form.cleaned_data['shareable']
+                self.object.public = form.cleaned_data['public']
+                self.object.save()
+
+                self.send_email_to_active_writers(
+                    self.object,
+                    "The story has been set as {}public and {}".format(
+                        "" if self.object.public else "not ",
+                        "" if self.object.shareable else "not "
+                    ) + "shareable by writer {}.".format(request.user.username)
+                )
         else:
             context['errors'] = True
 
@@ -96,21 +268,214 @@ class PrintableStoryView(DetailView, EmailActiveWritersMixin):
         return self.render_to_response(context)
 
 
+class PrintableStorySlugView(View):
+    """
+    Send links that only carry the story's slug to its printable page, when
+    the slug belongs to a single story.
+    """
+
+    def get(self, request, *args, **kwargs):
+        stories = list(Story.objects.filter(
+            slug=kwargs['title']
+        ).values_list('pk', flat=True)[:2])
+        if len(stories) != 1:
+            return HttpResponseRedirect(reverse('index'))
+        return HttpResponseRedirect(reverse('printable_story', kwargs={
+            'pk': stories[0], 'title': kwargs['title']
+        }))
+
+
+class PrintableStoryExportView(View):
+    """
+    Stream the printable story as an html page, or as a plain text or
+    Markdown download, writing out snippets as they are read so very long
+    stories start arriving at once and never sit whole in memory.
+    """
+
+    def get(self, request, *args, **kwargs):
+        story = Story.objects.filter(pk=kwargs['pk']).first()
+        if story is None or (
+            story.slug != kwargs['title']
+        ) or (
+            kwargs['format'] not in EXPORTERS
+        ):
+            return HttpResponseRedirect(reverse('index'))
+
+        if not (story.shareable or story.has_writer(request.user)):
+            return HttpResponseRedirect(reverse('printable_story', kwargs={
+                'pk': story.pk, 'title': kwargs['title']
+            }))
+
+        response = StreamingHttpResponse(
+            EXPORTERS[kwargs['format']](story),
+            content_type=EXPORT_CONTENT_TYPES[kwargs['format']]
+        )
+        if kwargs['format'] != 'html':
+            response['Content-Disposition'] = (
+                'attachment; filename="{}.{}"'.format(
+                    kwargs['title'], kwargs['format']
+                )
+            )
+        return response
+
+
 class PublicStoriesView(ListView):
     model = Story
     template_name = 'storysharing/public_stories.html'
 
     def get(self, request, *args, **kwargs):
+        """
+        The listing is the same for every reader, so it is rendered once
+        per page and writer filter and cached until the public catalog
+        changes (see Story.bump_catalog_version).
+        """
+        self.object_list = None
+        context = {}
         if 'writer' in request.GET:
-            writer = User.objects.filter(username=request.GET['writer'])[0]
-            self.object_list = self.get_queryset().filter(writers__in=[writer])
-            context = self.get_context_data()
-            context['filtered_writer'] = writer
-            return self.render_to_response(context)
-        return super().get(request, *args, **kwargs)
+            context['filtered_writer'] = request.GET['writer']
+        context['listing'] = get_versioned_fragment(
+            self.get_listing_cache_key(),
+            Story.get_catalog_version(),
+            lambda: self.render_listing(context),
+            PUBLIC_STORIES_CACHE_TIMEOUT,
+            PUBLIC_STORIES_STALE_TIMEOUT,
+            PUBLIC_STORIES_REBUILD_TIMEOUT
+        )
+        return self.render_to_response(context)
+
+    def render_listing(self, context):
+        stories = self.get_queryset()
+        if 'filtered_writer' in context:
+            stories = stories.filter(pk__in=StoryWriter.get_public_story_ids(
+                context['filtered_writer']
+            ))
+
+        self.object_list, previous_cursor, next_cursor = self.get_page(
+            stories
+        )
+        context['object_list'] = self.object_list
+        context['previous_page'] = self.get_page_url(previous_cursor)
+        context['next_page'] = self.get_page_url(next_cursor)
+        return render_to_string(
+            'storysharing/public_stories_list.html', context
+        )
+
+    def get_listing_cache_key(self):
+        page = (
+            self.request.GET.get('writer'),
+            self.get_page_size(),
+            self.get_cursor('before'),
+            self.get_cursor('after')
+        )
+        return 'public_stories:{}'.format(
+            hashlib.md5(repr(page).encode()).hexdigest()
+        )
 
     def get_queryset(self):
-        return Story.objects.filter(public=True).order_by('title')
+        return Story.objects.filter(public=True).prefetch_related(Prefetch(
+            'writers', queryset=User.objects.only('username')
+        ))
+
+    def get_page_size(self):
+        try:
+            page_size = int(self.request.GET['per_page'])
+        except (KeyError, ValueError):
+            return PUBLIC_STORIES_PER_PAGE
+        return min(max(page_size, 1), PUBLIC_STORIES_MAX_PER_PAGE)
+
+    def get_cursor(self, direction):
+        try:
+            return (
+                self.request.GET[direction + '_title'],
+                int(self.request.GET[direction + '_id'])
+            )
+        except (KeyError, ValueError):
+            return None
+
+    def get_page(self, stories):
+        """
+        Return a page of stories ordered by (title, id), with the cursors to
+        the pages before and after it (None when there is no such page).
+
+        Pages are found from the last (or, going back, the first) story of
+        the page the reader comes from, which is a range scan on the
+        (public, title, id) index, so every page costs the same.
+        """
+        page_size = self.get_page_size()
+        before = self.get_cursor('before')
+        after = None if before else self.get_cursor('after')
+
+        if before is not None:
+            title, pk = before
+            stories = stories.filter(title__lte=title).exclude(
+                title=title, pk__gte=pk
+            ).order_by('-title', '-pk')
+        else:
+            if after is not None:
+                title, pk = after
+                stories = stories.filter(title__gte=title).exclude(
+                    title=title, pk__lte=pk
+                )
+            stories = stories.order_by('title', 'pk')
+
+        page = list(stories[:page_size + 1])
+        more = len(page) > page_size
+        page = page[:page_size]
+        if before is not None:
+            page.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = after is not None, more
+
+        if not page:
+            return page, None, None
+        return page, (
+            ('before', page[0]) if has_previous else None
+        ), (
+            ('after', page[-1]) if has_next else None
+        )
+
+    def get_page_url(self, cursor):
+        if cursor is None:
+            return None
+        direction, story = cursor
+        params = [
+            (name, self.request.GET[name]) for name in ('writer', 'per_page')
+            if name in self.request.GET
+        ]
+        params += [
+            (direction + '_title', story.title),
+            (direction + '_id', story.pk)
+        ]
+        return "?" + urlencode(params)
+
+
+class SearchView(View):
+    template_name = 'storysharing/search.html'
+
+    def get(self, request, *args, **kwargs):
+        terms = request.GET.get('q', '').strip()
+        try:
+            page = int(request.GET['page'])
+        except (KeyError, ValueError):
+            page = 1
+        page = min(max(page, 1), SEARCH_MAX_PAGES)
+
+        results, has_next = [], False
+        if terms:
+            results, has_next = search_stories(
+                terms, page, SEARCH_RESULTS_PER_PAGE
+            )
+
+        return render(request, self.template_name, {
+            'terms': terms,
+            'results': results,
+            'page': page,
+            'previous_page': page - 1 if page > 1 else None,
+            'next_page': (
+                page + 1 if has_next and page < SEARCH_MAX_PAGES else None
+            )
+        })
 
 
 class PersonalStoriesView(ListView, EmailActiveWritersMixin):
@@ -118,57 +483,141 @@ class PersonalStoriesView(ListView, EmailActiveWritersMixin):
     template_name = 'storysharing/personal_stories.html'
     form_name = StoryWriterActiveForm
 
-    def set_available_story(self, story):
-        no_active_writers = StoryWriter.objects.filter(
-            story=story).filter(active=True).count()
-
-        if no_active_writers >= 2:
-            story.available = True
-            story.save()
+    def notify_availability(self, story, available):
+        """
+        Tell the story's active writers it became available, as returned by
+        StoryWriter.set_active.
+        """
+        if available:
             self.send_email_to_active_writers(
                 story=story,
                 update="The story is now available to play."
             )
-        else:
-            story.available = False
-            story.save()
 
     def get_context_data(self, **kwargs):
+        self.object_list, previous_pk, next_pk = self.get_page(
+            self.get_queryset()
+        )
         context = super().get_context_data(**kwargs)
         context['form'] = self.form_name()
+        context['previous_page'] = self.get_page_url('before', previous_pk)
+        context['next_page'] = self.get_page_url('after', next_pk)
         return context
 
     def post(self, request, *args, **kwargs):
-        self.object_list = self.get_queryset()
-        context = self.get_context_data(**kwargs)
-
         form = self.form_name(request.POST)
         if form.is_valid():
             story = form.cleaned_data['story']
-            storywriter = StoryWriter.objects.filter(
-                story=story
-            ).filter(writer=request.user)[0]
-            storywriter.active = form.cleaned_data['active']
-            storywriter.save()
-            self.set_available_story(storywriter.story)
-
-        return self.render_to_response(context)
+            storywriter = story.get_storywriter(request.user)
+            if storywriter is not None:
+                with transaction.atomic():
+                    available = storywriter.set_active(
+                        form.cleaned_data['active']
+                    )
+                    story.clear_active_writers()
+                    self.notify_availability(story, available)
+
+        # The page is read after the change, from the same queryset as GET.
+        return self.render_to_response(self.get_context_data(**kwargs))
 
     @method_decorator(login_required)
     def dispatch(self, *args, **kwargs):
         return super().dispatch(*args, **kwargs)
 
     def get_queryset(self):
+        """
+        The story of every row and the usernames of its writers are fetched
+        with the rows, so a page costs the same queries however many
+        stories the user writes.
+        """
         return StoryWriter.objects.filter(
-            writer=self.request.user).order_by('-pk')
+            writer=self.request.user
+        ).select_related('story').prefetch_related(Prefetch(
+            'story__writers', queryset=User.objects.only('username')
+        ))
+
+    def get_cursor(self, direction):
+        try:
+            return int(self.request.GET[direction])
+        except (KeyError, ValueError):
+            return None
+
+    def get_page(self, storywriters):
+        """
+        Return a page of rows, latest first, with the pk to find the page
+        before and after it from (None when there is no such page).
+        """
+        before = self.get_cursor('before')
+        after = None if before else self.get_cursor('after')
+
+        if before is not None:
+            storywriters = storywriters.filter(pk__gt=before).order_by('pk')
+        else:
+            if after is not None:
+                storywriters = storywriters.filter(pk__lt=after)
+            storywriters = storywriters.order_by('-pk')
+
+        page = list(storywriters[:PERSONAL_STORIES_PER_PAGE + 1])
+        more = len(page) > PERSONAL_STORIES_PER_PAGE
+        page = page[:PERSONAL_STORIES_PER_PAGE]
+        if before is not None:
+            page.reverse()
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = after is not None, more
+
+        if not page:
+            return page, None, None
+        return (
+            page,
+            page[0].pk if has_previous else None,
+            page[-1].pk if has_next else None
+        )
+
+    def get_page_url(self, direction, pk):
+        if pk is None:
+            return None
+        return "?" + urlencode([(direction, pk)])
+
+
+class PersonalStoriesBulkView(View, EmailActiveWritersMixin):
+    """
+    Set the user active or inactive in every story of a page of personal
+    stories at once, then go back to that page.
+    """
+    form_name = StoryWriterBulkActiveForm
+
+    @method_decorator(login_required)
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        form = self.form_name(request.POST)
+        if form.is_valid():
+            with transaction.atomic():
+                available = StoryWriter.set_active_stories(
+                    request.user,
+                    [story.pk for story in form.cleaned_data['story']],
+                    {story.pk for story in form.cleaned_data['active']}
+                )[0]
+                # One email for each story that became available.
+                for story in Story.objects.filter(pk__in=available):
+                    self.send_email_to_active_writers(
+                        story=story,
+                        update="The story is now available to play."
+                    )
+
+        url = reverse('personal')
+        if request.GET:
+            url += "?" + request.GET.urlencode()
+        return HttpResponseRedirect(url)
 
 
 class StartStoryView(View):
     template_name = 'storysharing/start_story.html'
-    context = {}
     form_name = StartStoryForm
 
-    def send_email_to_writers(self, user, story):
+    def send_email_to_writers(self, user, writers):
         body = "You've been addded to a story created by {}.\n".format(
             user.username) + "If you wish to be part of it, visit {} ".format(
             SITE_DOMAIN + reverse('personal')
@@ -178,13 +627,12 @@ class StartStoryView(View):
             "you won't receive emails regarding its progress."
             ) + "You can only take part in the stories you set as active.\n\n"
         body = body + "Kindly, the {} team".format(SITE_DOMAIN)
-        for writer in story.writers.get_queryset():
-            send_mail(
-                "Black Cat Story Sharing - News",
-                body,
-                EMAIL_HOST_USER,
-                [writer.email]
-            )
+        queue_mail(
+            "Black Cat Story Sharing - News",
+            body,
+            EMAIL_HOST_USER,
+            [writer.email for writer in writers]
+        )
 
     @method_decorator(login_required)
     def dispatch(self, *args, **kwargs):
@@ -195,108 +643,266 @@ class StartStoryView(View):
         form.fields['writers'].queryset = User.objects.exclude(
             username=request.user.username
         )
-        self.context['form'] = form
-        return render(request, self.template_name, self.context)
+        return render(request, self.template_name, {'form': form})
 
     def post(self, request, *args, **kwargs):
         form = self.form_name(request.POST)
         if form.is_valid():
             title = form.cleaned_data['title']
             public = form.cleaned_data['public']
-            story = Story.objects.create(
-                title=title,
-                public=public
-            )
-
-            StoryWriter.objects.create(story=story, writer=request.user)
-            for writer in form.cleaned_data['writers']:
-                StoryWriter.objects.create(story=story, writer=writer)
+            writers = [request.user] + [
+                writer for writer in form.cleaned_data['writers']
+                if writer.pk != request.user.pk
+            ]
+            with transaction.atomic():
+                story = Story.objects.create(
+                    title=title,
+                    public=public
+                )
 
-            self.send_email_to_writers(request.user, story)
+                # One INSERT for all the writers. It skips StoryWriter.save
+                # and its signals: no writer is active yet, so there is no
+                # count to keep, and the public catalog is bumped here
+                # instead.
+                StoryWriter.objects.bulk_create([
+                    StoryWriter(story=story, writer=writer)
+                    for writer in writers
+                ])
+                if public:
+                    Story.bump_catalog_version()
+
+                # Queued in the outbox, in this transaction; SMTP is left
+                # to the send_queued_mail command.
+                self.send_email_to_writers(request.user, writers)
             return HttpResponseRedirect(
                 reverse('display_story', kwargs={'id': story.id})
             )
 
-        self.context['errors'] = True
         form.fields['writers'].queryset = User.objects.exclude(
             username=request.user.username
         )
-        self.context['form'] = form
-        return render(request, self.template_name, self.context)
+        return render(
+            request, self.template_name, {'form': form, 'errors': True}
+        )
 
 
-class DisplayStoryView(View, EmailActiveWritersMixin):
+class DisplayStoryView(ConditionalStoryMixin, View, EmailActiveWritersMixin):
     template_name = "storysharing/display_story.html"
     form_name = CreateSnippetForm
-    context = {}
+    story_kwarg = 'id'
+
+    def get_snippets_page(self, story, before=None):
+        """
+        Return a page of snippets in story order and the cursor to the
+        snippets that come before it (None when it is the first page).
+
+        Without a cursor the latest page is returned, so writers see where to
+        continue; the 'before' cursor walks back through the story using the
+        (story, id) index.
+        """
+        snippets = Snippet.objects.filter(story=story)
+        if before is not None:
+            snippets = snippets.filter(pk__lt=before)
+        page = list(snippets.select_related('author').only(
+            *FRAGMENT_FIELDS['display'], 'author__username'
+        ).order_by('-pk')[:SNIPPETS_PER_PAGE + 1])
+
+        earlier = None
+        if len(page) > SNIPPETS_PER_PAGE:
+            page = page[:SNIPPETS_PER_PAGE]
+            earlier = page[-1].pk
+        page.reverse()
+        return render_snippet_fragments(page, 'display'), earlier
 
     def get(self, request, *args, **kwargs):
         try:
             story = Story.objects.filter(id=kwargs['id'])[0]
-            self.context['story'] = story
         except IndexError:
             return render(request, self.template_name, {'doesnt_exist': True})
 
-        writers_queryset = story.writers.get_queryset()
+        storywriter = story.get_storywriter(request.user)
 
-        if not (story.public or request.user in writers_queryset):
+        if not (story.public or storywriter):
             return render(request, self.template_name, {'doesnt_exist': True})
 
-        snippets = Snippet.objects.filter(story=story).order_by('pk')
-        self.context['snippets'] = snippets
+        try:
+            before = int(request.GET['before'])
+        except (KeyError, ValueError):
+            before = None
+
+        snippets, earlier = self.get_snippets_page(story, before)
+        context = {
+            'story': story,
+            'snippets': snippets,
+            'earlier_snippets': earlier,
+            'latest_page': before is None,
+            'sync_interval': STORY_SYNC_POLL_INTERVAL,
+            'editable': bool(storywriter)
+        }
 
-        if request.user in writers_queryset:
-            self.context['editable'] = True
-            storywriter = StoryWriter.objects.filter(
-                story=story
-            ).filter(writer=request.user)[0]
-            self.context['storywriter'] = storywriter
+        if storywriter:
+            context['storywriter'] = storywriter
 
             form = self.form_name()
 
-            last_snippet = snippets.last()
-
-            if last_snippet and last_snippet.author == request.user:
+            if story.last_author_id == request.user.id:
                     form = False
 
-            self.context['form'] = form
-
-        else:
-            self.context['editable'] = False
-
-        return render(request, self.template_name, self.context)
+            context['form'] = form
+
+        return render(request, self.template_name, context)
+
+    def get_turn_error(self, story, storywriter):
+        """
+        Return why storywriter may not add the next snippet to story, or
+        None when they may: they must be active in an available story, and
+        never add two snippets in a row.
+        """
+        if storywriter is None:
+            return "You are no longer a writer of this story."
+        if not storywriter.active:
+            return (
+                "You are not active in this story. Set yourself as active "
+                "in your stories to add snippets."
+            )
+        if not story.available:
+            return (
+                "This story is not available to play right now: it needs "
+                "at least {} active writers.".format(Story.min_active_writers)
+            )
+        if story.last_author_id == storywriter.writer_id:
+            return (
+                "You added the last snippet. Wait for one of the other "
+                "writers to add theirs."
+            )
+        return None
 
     def post(self, request, *args, **kwargs):
 
         form = self.form_name(request.POST)
 
-        story = Story.objects.filter(id=kwargs['id'])[0]
+        story = Story.objects.filter(id=kwargs['id']).first()
+        if story is None or not story.has_writer(request.user):
+            return render(request, self.template_name, {'doesnt_exist': True})
+        context = {}
 
         if form.is_valid():
             snippet_text = form.cleaned_data['text']
-            Snippet.objects.create(
-                story=story,
-                author=request.user,
-                text=snippet_text
-            )
-            form = False
-            self.send_email_to_active_writers(
-                story=story,
-                update="A new Snippet has been added to the story."
-            )
+            with transaction.atomic():
+                # Posts to the same story wait for each other here, so each
+                # one checks the turn against the snippet added before it.
+                story = Story.objects.select_for_update().get(pk=story.pk)
+                storywriter = story.get_storywriter(request.user)
+                turn_error = self.get_turn_error(story, storywriter)
+                if turn_error is None:
+                    Snippet.objects.create(
+                        story=story,
+                        author=request.user,
+                        text=snippet_text
+                    )
+                    self.send_email_to_active_writers(
+                        story=story,
+                        update="A new Snippet has been added to the story."
+                    )
+            if turn_error is None:
+                # The page polls for changes after the version it shows.
+                story.refresh_from_db()
+                form = False
+            else:
+                # Keep the text, so it can be added once it's their turn.
+                form.add_error(None, turn_error)
         else:
-            self.context.update({'form_errors': True})
+            context['form_errors'] = True
 
-        post_context = {
+        snippets, earlier = self.get_snippets_page(story)
+        context.update({
             "story": story,
+            "storywriter": story.get_storywriter(request.user),
             "editable": True,
-            "snippets": Snippet.objects.filter(story=story),
+            "snippets": snippets,
+            "earlier_snippets": earlier,
+            "latest_page": True,
+            "sync_interval": STORY_SYNC_POLL_INTERVAL,
             "form": form
-        }
+        })
 
-        self.context.update(post_context)
+        return render(request, self.template_name, context)
 
-        return render(request, self.template_name, self.context)
+
+class StorySyncView(View):
+    """
+    Return, as JSON, the snippets a client of a story hasn't seen yet: those
+    after its 'after' snippet id and those changed after its story 'version'.
+
+    Both cursors are answered from the (story, id) and (story,
+    story_version) indexes, so a sync costs the same whatever the length
+    of the story. At most SNIPPETS_PER_PAGE snippets are returned; the
+    cursors in the response pick up from there.
+
+    The answer to given cursors only changes with the story version, which
+    is its ETag: display pages poll with their version and get a 304 until
+    the story changes.
+    """
+
+    def get_cursor(self, request, name):
+        try:
+            return max(int(request.GET[name]), 0)
+        except (KeyError, ValueError):
+            return None
+
+    def get(self, request, *args, **kwargs):
+        story = Story.objects.filter(id=kwargs['id']).first()
+        if story is None or not (
+            story.public or story.has_writer(request.user)
+        ):
+            return JsonResponse({'error': "Story not found."}, status=404)
+
+        etag = '"{}-{}"'.format(story.id, story.version)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.get_sync_response(request, story)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_sync_response(self, request, story):
+        after = self.get_cursor(request, 'after')
+        version = self.get_cursor(request, 'version')
+
+        snippets = Snippet.objects.filter(story=story)
+        changed = Q()
+        if version is not None:
+            changed |= Q(story_version__gt=version)
+        if after is not None:
+            changed |= Q(pk__gt=after)
+        snippets = list(snippets.filter(changed).order_by(
+            'story_version', 'pk'
+        ).values(
+            'id', 'author__username', 'text', 'edited', 'version',
+            'story_version'
+        )[:SNIPPETS_PER_PAGE + 1])
+
+        complete = len(snippets) <= SNIPPETS_PER_PAGE
+        if complete:
+            version = story.version
+        else:
+            snippets = snippets[:SNIPPETS_PER_PAGE]
+            version = snippets[-1]['story_version']
+        after = max([after or 0] + [snippet['id'] for snippet in snippets])
+
+        return JsonResponse({
+            'story': story.id,
+            'version': version,
+            'after': after,
+            'complete': complete,
+            'snippets': [{
+                'id': snippet['id'],
+                'author': snippet['author__username'],
+                'text': snippet['text'],
+                'edited': snippet['edited'],
+                'version': snippet['version'],
+            } for snippet in snippets]
+        })
 
 
 class SnippetEditView(DetailView, EmailActiveWritersMixin):
@@ -318,18 +924,21 @@ class SnippetEditView(DetailView, EmailActiveWritersMixin):
             return HttpResponseRedirect(reverse('index'))
         form = self.form_name(request.POST)
         if form.is_valid():
-            self.object.edited = True
-            self.object.text = form.cleaned_data['text']
-            self.object.save()
-
-            self.send_email_to_active_writers(
-                self.object.story,
-                "{} edited one of their snippets in your shared story.".format(
-                    request.user
-                ) + "\nThe new text of the snippet is: \"{}\"".format(
-                    self.object.text
+            with transaction.atomic():
+                self.object.edited = True
+                self.object.text = form.cleaned_data['text']
+                self.object.save()
+
+                self.send_email_to_active_writers(
+                    self.object.story,
+                    "{} edited one of their snippets ".format(
+                        request.user
+                    ) + "in your shared story.\n{}".format(
+                        "The new text of the snippet is: \"{}\"".format(
+                            self.object.text
+                        )
+                    )
                 )
-            )
             return HttpResponseRedirect(reverse('display_story', kwargs={
                 'id': self.object.story.id
             }))
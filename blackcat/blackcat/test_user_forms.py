@@ -1,7 +1,8 @@
-from blackcat.storysharing.models import User
+from blackcat.storysharing.models import User, OutgoingEmail
+from django.core import mail
 from django.forms import HiddenInput
 from django.test import TestCase
-from .user_forms import CreateUserForm, ProfileForm
+from .user_forms import CreateUserForm, ProfileForm, QueuedPasswordResetForm
 
 
 class CreateUserFormTest(TestCase):
@@ -23,7 +24,7 @@ class ProfileFormTest(TestCase):
     def test_meta_data(self):
         self.assertEqual(ProfileForm._meta.model, User)
 
-        expected_fields = ["username", "email"]
+        expected_fields = ["username", "email", "digest_updates"]
         for field in expected_fields:
             self.assertIn(field, ProfileForm._meta.fields)
 
@@ -31,3 +32,24 @@ class ProfileFormTest(TestCase):
         self.assertTrue(isinstance(
             ProfileForm._meta.widgets['username'], HiddenInput
         ))
+
+
+class QueuedPasswordResetFormTest(TestCase):
+    def test_reset_email_is_queued(self):
+        user = User.objects.create(username='randomuser', email='a@email.com')
+        user.set_password('password')
+        user.save()
+        form = QueuedPasswordResetForm(data={'email': user.email})
+        self.assertTrue(form.is_valid())
+        form.save(
+            domain_override='testserver',
+            email_template_name='user/email_reset_password.html'
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.to_email, user.email)
+        self.assertIn(
+            "Please go to the following page and choose a new password:",
+            email.body
+        )
+        self.assertIn(user.username, email.body)
@@ -305,6 +305,23 @@ class ProfileViewTest(TestCase):
             "another@email.com"
         )
 
+    def test_post_digest_updates(self):
+        user = create_random_user()
+        self.client.login(username=user.username, password='password')
+        post_data = {
+            'username': user.username,
+            'email': user.email,
+            'digest_updates': True
+        }
+        response = self.client.post(
+            reverse('profile'), secure=True, data=post_data
+        )
+        self.assertContains(response, "Group story updates in a digest")
+        self.assertContains(response, "Changes applied")
+        self.assertTrue(
+            User.objects.filter(username=user.username)[0].digest_updates
+        )
+
     def test_post_incorrect_form(self):
         user = create_random_user()
         self.client.login(username=user.username, password='password')
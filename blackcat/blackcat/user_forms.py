@@ -1,5 +1,8 @@
-from django.contrib.auth.forms import UserCreationForm
+from blackcat.settings import EMAIL_HOST_USER
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.forms import ModelForm, HiddenInput
+from django.template import loader
+from blackcat.storysharing.mail import queue_mail
 from blackcat.storysharing.models import User
 
 
@@ -16,5 +19,22 @@ class ProfileForm(ModelForm):
 
     class Meta:
         model = User
-        fields = ("username", "email")
+        fields = ("username", "email", "digest_updates")
         widgets = {"username": HiddenInput()}
+        labels = {"digest_updates": "Group story updates in a digest"}
+        help_texts = {
+            "digest_updates": "Instead of one email per update, {}".format(
+                "receive a single email with all of them every few minutes."
+            )
+        }
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        subject = loader.render_to_string(subject_template_name, context)
+        subject = ''.join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        queue_mail(subject, body, from_email or EMAIL_HOST_USER, [to_email])
@@ -17,17 +17,14 @@ from blackcat.storysharing.models import User
 class CreateUserView(View):
     form_class = CreateUserForm
     template_name = "user/create_user.html"
-    context = {}
     success_url = "/"
 
     def get(self, request, *args, **kwargs):
         form = self.form_class()
-        self.context['form'] = form
-        return render(request, self.template_name, self.context)
+        return render(request, self.template_name, {'form': form})
 
     def post(self, request, *args, **kwargs):
         form = self.form_class(request.POST)
-        self.context['form'] = form
         if form.is_valid():
             logout(request)
             email = form.cleaned_data['email']
@@ -40,7 +37,7 @@ class CreateUserView(View):
             login(request, user)
             return HttpResponseRedirect(self.success_url)
 
-        return render(request, self.template_name, self.context)
+        return render(request, self.template_name, {'form': form})
 
 
 @method_decorator(sensitive_post_parameters(), name='dispatch')
@@ -50,31 +47,30 @@ class CreateUserView(View):
 class ProfileView(View):
     form_class = ProfileForm
     template_name = "storysharing/profile.html"
-    context = {}
 
     def get_initial_form(self, request):
         initial = {
             "username": request.user.username,
-            'email': request.user.email
+            'email': request.user.email,
+            'digest_updates': request.user.digest_updates
         }
         return initial
 
     def get(self, request, *args, **kwargs):
         form = self.form_class(initial=self.get_initial_form(request))
-        self.context['form'] = form
-        return render(request, self.template_name, self.context)
+        return render(request, self.template_name, {'form': form})
 
     def post(self, request, *args, **kwargs):
         form = self.form_class(request.POST, instance=request.user)
-        self.context['applied'] = False
+        applied = False
 
         if form.is_valid():
             user = request.user
             user.email = form.cleaned_data['email']
+            user.digest_updates = form.cleaned_data['digest_updates']
             user.save()
             form = self.form_class(initial=self.get_initial_form(request))
-            self.context['applied'] = True
+            applied = True
 
-        self.context['submitted'] = True
-        self.context['form'] = form
-        return render(request, self.template_name, self.context)
+        context = {'applied': applied, 'submitted': True, 'form': form}
+        return render(request, self.template_name, context)